@@ -0,0 +1,523 @@
+"""
+File: arraybst.py
+Array-backed engine for the binary search tree.
+"""
+
+from abstractcollection import AbstractCollection
+from array import array
+from bisect import bisect_left, bisect_right
+from math import log
+from sys import getsizeof
+
+# Index standing for a missing child or an empty tree
+NIL = -1
+
+
+class ArrayBST(AbstractCollection):
+    """A binary search tree kept in parallel arrays instead of node
+    objects. Slot i is one node: its item is self._keys[i], its
+    children are the slots self._left[i] and self._right[i] (NIL for
+    none), and self._sizes[i], self._heights[i] describe its subtree.
+    Offers the same interface as LinkedBST."""
+
+    def __init__(self, sourceCollection=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present.
+        The contents are linked into a balanced tree in one pass."""
+        self._keys = []
+        self._left = array('i')
+        self._right = array('i')
+        self._sizes = array('i')
+        self._heights = array('i')
+        self._free = []
+        self._root = NIL
+        AbstractCollection.__init__(self)
+        if sourceCollection:
+            self._build(sourceCollection)
+
+    # Accessor methods
+    def __str__(self):
+        """Returns a string representation with the tree rotated
+        90 degrees counterclockwise."""
+
+        def recurse(node, level):
+            info = ""
+            if node != NIL:
+                info += recurse(self._right[node], level + 1)
+                info += "| " * level
+                info += str(self._keys[node]) + "\n"
+                info += recurse(self._left[node], level + 1)
+            return info
+
+        return recurse(self._root, 0)
+
+    def __iter__(self):
+        """Supports a preorder traversal on a view of self."""
+        stack = []
+        if self._root != NIL:
+            stack.append(self._root)
+        while stack:
+            node = stack.pop()
+            yield self._keys[node]
+            if self._right[node] != NIL:
+                stack.append(self._right[node])
+            if self._left[node] != NIL:
+                stack.append(self._left[node])
+
+    def preorder(self):
+        """Supports a preorder traversal on a view of self."""
+        return self.__iter__()
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self."""
+        stack = []
+        node = self._root
+        while node != NIL or stack:
+            while node != NIL:
+                stack.append(node)
+                node = self._left[node]
+            node = stack.pop()
+            yield self._keys[node]
+            node = self._right[node]
+
+    def postorder(self):
+        """Supports a postorder traversal on a view of self."""
+        stack = []
+        node = self._root
+        last_visited = NIL
+        while node != NIL or stack:
+            if node != NIL:
+                stack.append(node)
+                node = self._left[node]
+            else:
+                top = stack[-1]
+                right = self._right[top]
+                if right != NIL and right != last_visited:
+                    node = right
+                else:
+                    yield self._keys[top]
+                    last_visited = stack.pop()
+
+    def levelorder(self):
+        """Supports a levelorder traversal on a view of self."""
+        level = []
+        if self._root != NIL:
+            level.append(self._root)
+        while level:
+            next_level = []
+            for node in level:
+                yield self._keys[node]
+                if self._left[node] != NIL:
+                    next_level.append(self._left[node])
+                if self._right[node] != NIL:
+                    next_level.append(self._right[node])
+            level = next_level
+
+    def __contains__(self, item):
+        """Returns True if target is found or False otherwise."""
+        return self._locate(item) != NIL
+
+    def find(self, item):
+        """If item matches an item in self, returns the
+        matched item, or None otherwise."""
+        node = self._locate(item)
+        if node == NIL:
+            return None
+        return self._keys[node]
+
+    def find_many(self, items, presorted=False):
+        '''
+        Looks up every item of items and returns the list of what
+        find would return for each of them, in input order.
+        Works as LinkedBST.find_many does.
+        :param items: iterable
+        :param presorted: bool
+        :return: list
+        '''
+        items = list(items)
+        if presorted:
+            order = range(len(items))
+            queries = items
+        else:
+            order = sorted(range(len(items)), key=items.__getitem__)
+            queries = [items[index] for index in order]
+        results = [None] * len(items)
+        pending = []
+        if self._root != NIL and queries:
+            pending.append((self._root, 0, len(queries)))
+        while pending:
+            node, low, high = pending.pop()
+            key = self._keys[node]
+            first = bisect_left(queries, key, low, high)
+            last = bisect_right(queries, key, first, high)
+            for index in range(first, last):
+                results[order[index]] = key
+            if low < first and self._left[node] != NIL:
+                pending.append((self._left[node], low, first))
+            if last < high and self._right[node] != NIL:
+                pending.append((self._right[node], last, high))
+        return results
+
+    def height(self):
+        '''
+        Return the height of tree.
+        :return: int
+        '''
+        return self._height(self._root)
+
+    def is_balanced(self):
+        '''
+        Return True if tree is balanced.
+        :return: bool
+        '''
+        return self.height() < 2*log(self._size + 1, 2) - 1
+
+    def range_find(self, low, high):
+        '''
+        Returns a list of the items in the tree, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: list
+        '''
+        return list(self.iter_range(low, high))
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items of the tree, where low <= item <= high,
+        in sorted order.
+        :param low:
+        :param high:
+        :return: iterator
+        '''
+        stack = []
+        node = self._root
+        while True:
+            while node != NIL:
+                if self._keys[node] < low:
+                    node = self._right[node]
+                else:
+                    stack.append(node)
+                    node = self._left[node]
+            if not stack:
+                return
+            node = stack.pop()
+            if self._keys[node] > high:
+                return
+            yield self._keys[node]
+            node = self._right[node]
+
+    def successor(self, item):
+        """
+        Returns the smallest item that is larger than
+        item, or None if there is no such item.
+        """
+        found = None
+        node = self._root
+        while node != NIL:
+            if self._keys[node] > item:
+                found = self._keys[node]
+                node = self._left[node]
+            else:
+                node = self._right[node]
+        return found
+
+    def predecessor(self, item):
+        """
+        Returns the largest item that is smaller than
+        item, or None if there is no such item.
+        """
+        found = None
+        node = self._root
+        while node != NIL:
+            if self._keys[node] < item:
+                found = self._keys[node]
+                node = self._right[node]
+            else:
+                node = self._left[node]
+        return found
+
+    def rank(self, item):
+        '''
+        Return the number of items in the tree that are smaller than item.
+        :param item:
+        :return: int
+        '''
+        return self._count_below(item, False)
+
+    def select(self, index):
+        '''
+        Return the item at position index (counting from 0) of the
+        inorder traversal.
+        Raises: IndexError if index is out of range.
+        :param index: int
+        :return: item
+        '''
+        if not 0 <= index < self._size:
+            raise IndexError("Tree index out of range.")
+        node = self._root
+        while True:
+            left_size = self._size_of(self._left[node])
+            if index < left_size:
+                node = self._left[node]
+            elif index == left_size:
+                return self._keys[node]
+            else:
+                index -= left_size + 1
+                node = self._right[node]
+
+    def count_range(self, low, high):
+        '''
+        Return the number of items in the tree, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: int
+        '''
+        if high < low:
+            return 0
+        return self._count_below(high, True) - self._count_below(low, False)
+
+    def bytes_per_node(self):
+        '''
+        Return the memory taken by the tree structure per item:
+        the arrays of links, sizes and heights plus the slot holding a
+        reference to each key (the key objects themselves excluded).
+        :return: float
+        '''
+        if self.isEmpty():
+            return 0.0
+        total = getsizeof(self._keys) + getsizeof(self._free)
+        for column in (self._left, self._right, self._sizes, self._heights):
+            total += getsizeof(column)
+        return total / self._size
+
+    # Mutator methods
+    def clear(self):
+        """Makes self become empty."""
+        self._keys = []
+        self._left = array('i')
+        self._right = array('i')
+        self._sizes = array('i')
+        self._heights = array('i')
+        self._free = []
+        self._root = NIL
+        self._size = 0
+
+    def add(self, item):
+        """Adds item to the tree."""
+        new_node = self._allocate(item)
+        if self._root == NIL:
+            self._root = new_node
+        else:
+            path = []
+            node = self._root
+            while node != NIL:
+                path.append(node)
+                if item < self._keys[node]:
+                    node = self._left[node]
+                else:
+                    node = self._right[node]
+            parent = path[-1]
+            if item < self._keys[parent]:
+                self._left[parent] = new_node
+            else:
+                self._right[parent] = new_node
+            self._retrace(path)
+        self._size += 1
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: item is removed from self."""
+        path = []
+        parent = NIL
+        node = self._root
+        while node != NIL and self._keys[node] != item:
+            parent = node
+            path.append(node)
+            if self._keys[node] > item:
+                node = self._left[node]
+            else:
+                node = self._right[node]
+        if node == NIL:
+            raise KeyError("Item not in tree.")
+        item_removed = self._keys[node]
+
+        if self._left[node] != NIL and self._right[node] != NIL:
+            # Move the maximum of the left subtree up into node
+            # and unlink the slot it came from instead
+            top = node
+            path.append(top)
+            parent = top
+            node = self._left[top]
+            while self._right[node] != NIL:
+                parent = node
+                path.append(parent)
+                node = self._right[node]
+            self._keys[top] = self._keys[node]
+
+        if self._left[node] == NIL:
+            new_child = self._right[node]
+        else:
+            new_child = self._left[node]
+        if parent == NIL:
+            self._root = new_child
+        elif self._left[parent] == node:
+            self._left[parent] = new_child
+        else:
+            self._right[parent] = new_child
+        self._release(node)
+        self._retrace(path)
+        self._size -= 1
+        return item_removed
+
+    def replace(self, item, new_item):
+        """
+        If item is in self, replaces it with newItem and
+        returns the old item, or returns None otherwise."""
+        node = self._locate(item)
+        if node == NIL:
+            return None
+        old_data = self._keys[node]
+        self._keys[node] = new_item
+        return old_data
+
+    def rebalance(self):
+        '''
+        Rebalances the tree, compacting the arrays on the way.
+        :return: self
+        '''
+        self._build(list(self.inorder()))
+        return self
+
+    # Helper methods
+    def _build(self, items):
+        '''
+        Replaces the contents of self with items: slot i receives the
+        i-th smallest item, and the links of a perfectly balanced tree
+        are filled in without comparisons.
+        :param items: iterable
+        '''
+        sorted_list = list(items)
+        sorted_list.sort()
+        count = len(sorted_list)
+        self._keys = sorted_list
+        self._left = array('i', [NIL]) * count
+        self._right = array('i', [NIL]) * count
+        self._sizes = array('i', [1]) * count
+        self._heights = array('i', [0]) * count
+        self._free = []
+        self._size = count
+        self._root = self._link(0, count)
+
+    def _link(self, low, high):
+        '''
+        Links the slots low..high-1 into a balanced subtree.
+        :param low: int
+        :param high: int
+        :return: int, the slot of the subtree's root or NIL
+        '''
+        if low >= high:
+            return NIL
+        middle = (low + high) // 2
+        self._left[middle] = self._link(low, middle)
+        self._right[middle] = self._link(middle + 1, high)
+        self._sizes[middle] = high - low
+        self._heights[middle] = (high - low).bit_length() - 1
+        return middle
+
+    def _allocate(self, item):
+        '''
+        Return a free slot holding a new leaf with item.
+        :param item:
+        :return: int
+        '''
+        if self._free:
+            node = self._free.pop()
+            self._keys[node] = item
+            self._left[node] = NIL
+            self._right[node] = NIL
+            self._sizes[node] = 1
+            self._heights[node] = 0
+            return node
+        self._keys.append(item)
+        self._left.append(NIL)
+        self._right.append(NIL)
+        self._sizes.append(1)
+        self._heights.append(0)
+        return len(self._keys) - 1
+
+    def _release(self, node):
+        '''
+        Puts the slot of an unlinked node on the free list.
+        :param node: int
+        '''
+        self._keys[node] = None
+        self._free.append(node)
+
+    def _locate(self, item):
+        '''
+        Return the slot holding item, or NIL.
+        :param item:
+        :return: int
+        '''
+        node = self._root
+        while node != NIL:
+            key = self._keys[node]
+            if key < item:
+                node = self._right[node]
+            elif key > item:
+                node = self._left[node]
+            else:
+                return node
+        return NIL
+
+    def _count_below(self, item, inclusive):
+        '''
+        Return the number of items smaller than item (or equal to it,
+        if inclusive is True).
+        :param item:
+        :param inclusive: bool
+        :return: int
+        '''
+        count = 0
+        node = self._root
+        while node != NIL:
+            key = self._keys[node]
+            if key < item or (inclusive and key == item):
+                count += self._size_of(self._left[node]) + 1
+                node = self._right[node]
+            else:
+                node = self._left[node]
+        return count
+
+    def _size_of(self, node):
+        '''
+        Return the number of items in the subtree rooted at node.
+        :param node: int
+        :return: int
+        '''
+        if node == NIL:
+            return 0
+        return self._sizes[node]
+
+    def _height(self, node):
+        '''
+        Return the height of the subtree rooted at node.
+        :param node: int
+        :return: int
+        '''
+        if node == NIL:
+            return -1
+        return self._heights[node]
+
+    def _retrace(self, path):
+        '''
+        Refreshes the sizes and heights on the changed path, bottom-up.
+        :param path: list of int, from the root down
+        '''
+        for index in range(len(path) - 1, -1, -1):
+            node = path[index]
+            left, right = self._left[node], self._right[node]
+            self._sizes[node] = 1 + self._size_of(left) + self._size_of(right)
+            self._heights[node] = 1 + max(self._height(left),
+                                          self._height(right))
@@ -0,0 +1,83 @@
+"""
+File: bloomfilter.py
+Bloom filter answering definite misses before a tree lookup.
+"""
+
+from math import ceil, log
+
+# A multiply and an xor-shift spread the bits of hash() (which is the
+# value itself for small integers) over all 64 bits before they are
+# split into two hashes
+_MIX = 0x9E3779B97F4A7C15
+_MASK = (1 << 64) - 1
+
+
+class BloomFilter(object):
+    """A set of hashable keys that may answer "maybe present" for a key
+    never added, but never "absent" for a key that was. A filter sized
+    for capacity keys with error_rate takes about
+    capacity * 1.44 * log2(1 / error_rate) bits, about 1.2 bytes per
+    key for 1%, and tests a key with a few bit probes instead of a
+    descent through the tree. Keys cannot be taken out again."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        """Makes an empty filter for capacity keys with a false-positive
+        rate of error_rate once it holds them.
+        Raises: ValueError if error_rate is not between 0 and 1."""
+        if not 0 < error_rate < 1:
+            raise ValueError("Error rate must be between 0 and 1.")
+        capacity = max(capacity, 1)
+        self._nbits = max(ceil(-capacity * log(error_rate) / log(2) ** 2), 8)
+        self._hashes = max(round(self._nbits / capacity * log(2)), 1)
+        self._bits = bytearray((self._nbits + 7) // 8)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        # Number of keys added, repeats included
+        self.count = 0
+
+    def __contains__(self, key):
+        """Returns False if key was surely never added, or True if
+        it probably was.
+        The probes of _start are computed inline on this hot path."""
+        bits, nbits = self._bits, self._nbits
+        mixed = (hash(key) * _MIX) & _MASK
+        mixed ^= mixed >> 31
+        index = (mixed & 0xFFFFFFFF) % nbits
+        step = (mixed >> 32) % nbits or 1
+        for _ in range(self._hashes):
+            if not bits[index >> 3] & (1 << (index & 7)):
+                return False
+            index += step
+            if index >= nbits:
+                index -= nbits
+        return True
+
+    def add(self, key):
+        """Adds key to the filter."""
+        bits, nbits = self._bits, self._nbits
+        index, step = self._start(key)
+        for _ in range(self._hashes):
+            bits[index >> 3] |= 1 << (index & 7)
+            index += step
+            if index >= nbits:
+                index -= nbits
+        self.count += 1
+
+    def _start(self, key):
+        '''
+        Return the first bit position of key and the step to the next
+        ones: the i-th probe is h1 + i * h2 for the two halves of a
+        64-bit hash, which behaves like independent hashes.
+        :param key: hashable
+        :return: tuple of int
+        '''
+        mixed = (hash(key) * _MIX) & _MASK
+        mixed ^= mixed >> 31
+        return ((mixed & 0xFFFFFFFF) % self._nbits,
+                (mixed >> 32) % self._nbits or 1)
+
+    def info(self):
+        """Returns a dictionary with the sizes and the settings."""
+        return {"count": self.count, "capacity": self.capacity,
+                "error_rate": self.error_rate, "hashes": self._hashes,
+                "bytes": len(self._bits)}
@@ -0,0 +1,191 @@
+"""
+File: bstformat.py
+Compact binary file format for the shape and items of a binary search tree.
+
+Layout (little-endian):
+    header   magic b"LBST", format version (1 byte), key type (1 byte),
+             number of nodes n (8 bytes)
+    shape    n bytes, one per node in preorder: bit 0 set if the node
+             has a left child, bit 1 set if it has a right child
+    keys     the n items in preorder, stored by key type:
+             b"s" - n character counts (4 bytes each), then one UTF-8 blob
+             b"q" - n signed 8-byte integers
+             b"d" - n 8-byte floats
+             b"p" - a pickled list (any other items); unpickling can
+                    run arbitrary code, so load refuses these files
+                    unless allow_pickle is True
+
+The preorder stream together with the child flags determines the tree
+exactly, so it is rebuilt in one linear pass without comparisons.
+"""
+
+from array import array
+import mmap
+import pickle
+import struct
+import sys
+
+MAGIC = b"LBST"
+VERSION = 1
+HEADER = struct.Struct("<4sBcQ")
+HAS_LEFT = 1
+HAS_RIGHT = 2
+# Array type code of the 4-byte lengths: 'I' is only guaranteed to be
+# at least 2 bytes wide ('q' and 'd' are always 8)
+UINT32 = next(code for code in "IL" if array(code).itemsize == 4)
+
+
+def dump_nodes(path, root):
+    """
+    Write the tree rooted at root (BSTNode or None) to the file at path.
+    """
+    keys = []
+    shape = bytearray()
+    stack = []
+    if root is not None:
+        stack.append(root)
+    while stack:
+        node = stack.pop()
+        keys.append(node.data)
+        flags = 0
+        if node.left is not None:
+            flags |= HAS_LEFT
+        if node.right is not None:
+            flags |= HAS_RIGHT
+            stack.append(node.right)
+        if node.left is not None:
+            stack.append(node.left)
+        shape.append(flags)
+    _write(path, keys, shape)
+
+
+def dump_sorted(path, sorted_keys):
+    """
+    Write the perfectly balanced tree over sorted_keys to the file at
+    path, without building the tree first. Loading the file gives the
+    same shape as LinkedBST(sorted_keys).
+    """
+    keys = []
+    shape = bytearray()
+    stack = []
+    if sorted_keys:
+        stack.append((0, len(sorted_keys)))
+    while stack:
+        low, high = stack.pop()
+        middle = (low + high) // 2
+        keys.append(sorted_keys[middle])
+        flags = 0
+        if low < middle:
+            flags |= HAS_LEFT
+        if middle + 1 < high:
+            flags |= HAS_RIGHT
+            stack.append((middle + 1, high))
+        if low < middle:
+            stack.append((low, middle))
+        shape.append(flags)
+    _write(path, keys, shape)
+
+
+def load(path, allow_pickle=False):
+    """
+    Read the file at path, which is memory-mapped rather than read
+    into a bytes object, and return (keys, shape): the items in
+    preorder and the bytes of child flags. Pickled items are only
+    loaded if allow_pickle is True; never allow it for untrusted
+    files, since unpickling can execute arbitrary code.
+    Raises: ValueError if the file is not in this format, or if its
+    items are pickled and allow_pickle is False.
+    """
+    with open(path, 'rb') as source:
+        with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as blob:
+            view = memoryview(blob)
+            try:
+                return _decode(view, allow_pickle)
+            finally:
+                view.release()
+
+
+def _key_type(keys):
+    """
+    Return the key type tag to store keys with.
+    """
+    if all(type(key) is str for key in keys):
+        return b"s"
+    if all(type(key) is int for key in keys) and \
+            all(-2**63 <= key < 2**63 for key in keys):
+        return b"q"
+    if all(type(key) is float for key in keys):
+        return b"d"
+    return b"p"
+
+
+def _write(path, keys, shape):
+    """
+    Write the keys in preorder and their shape bytes to path.
+    """
+    tag = _key_type(keys)
+    with open(path, 'wb') as target:
+        target.write(HEADER.pack(MAGIC, VERSION, tag, len(keys)))
+        target.write(shape)
+        if tag == b"s":
+            target.write(_column_bytes(array(UINT32, map(len, keys))))
+            target.write("".join(keys).encode('utf-8'))
+        elif tag in (b"q", b"d"):
+            target.write(_column_bytes(array(tag.decode(), keys)))
+        else:
+            target.write(pickle.dumps(keys, pickle.HIGHEST_PROTOCOL))
+
+
+def _column_bytes(column):
+    """
+    Return the bytes of the array column in little-endian order.
+    """
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column.tobytes()
+
+
+def _column(code, data):
+    """
+    Return the array of type code read from the little-endian bytes data.
+    Raises: ValueError if data is cut short.
+    """
+    column = array(code)
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def _decode(view, allow_pickle):
+    """
+    Return (keys, shape) decoded from the memoryview of a whole file.
+    """
+    if len(view) < HEADER.size:
+        raise ValueError("Not a tree file.")
+    magic, version, tag, count = HEADER.unpack(view[:HEADER.size])
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a tree file.")
+    position = HEADER.size
+    shape = bytes(view[position:position + count])
+    position += count
+    if tag == b"s":
+        lengths = _column(UINT32, view[position:position + 4 * count])
+        position += 4 * count
+        text = str(view[position:], 'utf-8')
+        keys = []
+        start = 0
+        for length in lengths:
+            keys.append(text[start:start + length])
+            start += length
+    elif tag in (b"q", b"d"):
+        keys = _column(tag.decode(),
+                       view[position:position + 8 * count]).tolist()
+    elif tag == b"p":
+        if not allow_pickle:
+            raise ValueError("The items are pickled; pass allow_pickle=True "
+                             "to load a trusted file.")
+        keys = pickle.loads(view[position:])
+    else:
+        raise ValueError("Not a tree file.")
+    return keys, shape
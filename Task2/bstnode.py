@@ -6,7 +6,32 @@ Author: Ken Lambert
 class BSTNode(object):
     """Represents a node for a linked binary search tree."""
 
-    def __init__(self, data, left = None, right = None):
+    # No per-instance __dict__, which would otherwise take more
+    # memory than the item itself
+    __slots__ = ("data", "key", "left", "right", "height", "size")
+
+    def __init__(self, data, left = None, right = None, key = None):
         self.data = data
+        # What the tree compares: data itself, or data's key computed
+        # once by the tree's key function
+        self.key = data if key is None else key
         self.left = left
         self.right = right
+        # Height of the subtree rooted here (a leaf has height 0),
+        # kept up to date by the tree's mutators
+        self.height = 0
+        # Number of items in the subtree rooted here
+        self.size = 1
+
+
+class CountedBSTNode(BSTNode):
+    """Represents a node holding several equal items of a multiset tree."""
+
+    __slots__ = ("count",)
+
+    def __init__(self, data, left = None, right = None, count = 1,
+                 key = None):
+        BSTNode.__init__(self, data, left, right, key)
+        # How many equal items the node stands for; size counts them all
+        self.count = count
+        self.size = count
@@ -0,0 +1,76 @@
+"""
+Main module for the multithreaded stress test of ConcurrentBST:
+reader threads look words up while one writer thread keeps removing
+and adding words back, and the total read throughput is reported
+for a growing number of reader threads.
+"""
+from concurrentbst import ConcurrentBST
+from random import sample
+from threading import Event, Thread
+import time
+
+
+def read_words(path):
+    """
+    Return the list of words in the file at path, one per line.
+    """
+    with open(path, 'r') as dictionary:
+        return [line.strip() for line in dictionary]
+
+
+def run_readers(tree, queries, threads, duration):
+    """
+    Let threads readers query tree for duration seconds while a writer
+    updates it, and return (reads per second, writes per second).
+    """
+    stop = Event()
+    reads = [0] * threads
+    writes = [0]
+
+    def reader(number):
+        count = 0
+        while not stop.is_set():
+            for word in queries:
+                tree.find(word)
+            count += len(queries)
+        reads[number] = count
+
+    def writer():
+        count = 0
+        while not stop.is_set():
+            for word in queries[:100]:
+                tree.remove(word)
+                tree.add(word)
+            count += 200
+        writes[0] = count
+
+    workers = [Thread(target=reader, args=(number,)) for number in range(threads)]
+    workers.append(Thread(target=writer))
+    now = time.time()
+    for worker in workers:
+        worker.start()
+    time.sleep(duration)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - now
+    return sum(reads) / elapsed, writes[0] / elapsed
+
+
+def main(path, thread_counts=(1, 2, 4, 8), duration=2.0):
+    """
+    Build a ConcurrentBST from the words at path and print the
+    throughput reached with each number of reader threads.
+    """
+    words = read_words(path)
+    tree = ConcurrentBST(words)
+    queries = sample(words, 1000)
+    for threads in thread_counts:
+        read_rate, write_rate = run_readers(tree, queries, threads, duration)
+        print(f"{threads} reader thread(s): {read_rate:.0f} reads/s, "
+              f"{write_rate:.0f} writes/s.")
+    print(f"Tree still holds {len(tree)} words.")
+
+
+if __name__ == '__main__':
+    main('words.txt')
@@ -0,0 +1,249 @@
+"""
+File: concurrentbst.py
+Thread-safe binary search tree for many readers and background writers.
+"""
+
+from abstractcollection import AbstractCollection
+from persistentbst import PersistentBST
+from threading import Lock
+
+
+class ConcurrentBST(AbstractCollection):
+    """A binary search tree that may be shared between threads.
+    The current version is a PersistentBST that is never changed once
+    published. Readers take the current version with a single
+    attribute read and work on it without any lock; writers take the
+    write lock, apply their change to an O(1) snapshot of the current
+    version and publish the result, again with a single assignment.
+    So readers run in parallel with each other and with the writer,
+    writers are serialized, and nobody ever sees a half-done change."""
+
+    def __init__(self, sourceCollection=None, key=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present, ordered
+        by key(item) if key is given."""
+        AbstractCollection.__init__(self)
+        self._write_lock = Lock()
+        if isinstance(sourceCollection, ConcurrentBST):
+            sourceCollection = sourceCollection.snapshot()
+        self._tree = PersistentBST(sourceCollection, key)
+
+    def snapshot(self):
+        '''
+        Return the current version as a PersistentBST, in O(1).
+        :return: PersistentBST
+        '''
+        return self._tree.snapshot()
+
+    # Accessor methods
+    def __len__(self):
+        """Returns the number of items in self."""
+        return len(self._tree)
+
+    def __str__(self):
+        """Returns a string representation with the tree rotated
+        90 degrees counterclockwise."""
+        return str(self._tree)
+
+    def __iter__(self):
+        """Supports a preorder traversal on a view of self."""
+        return iter(self._tree)
+
+    def preorder(self):
+        """Supports a preorder traversal on a view of self."""
+        return self._tree.preorder()
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self."""
+        return self._tree.inorder()
+
+    def postorder(self):
+        """Supports a postorder traversal on a view of self."""
+        return self._tree.postorder()
+
+    def levelorder(self):
+        """Supports a levelorder traversal on a view of self."""
+        return self._tree.levelorder()
+
+    @property
+    def key(self):
+        """The key function ordering the items, or None."""
+        return self._tree.key
+
+    def __contains__(self, item):
+        """Returns True if target is found or False otherwise."""
+        return item in self._tree
+
+    def find(self, item):
+        """If item matches an item in self, returns the
+        matched item, or None otherwise."""
+        return self._tree.find(item)
+
+    def find_many(self, items, presorted=False):
+        '''
+        Returns the list of what find would return for each of items.
+        :param items: iterable
+        :param presorted: bool
+        :return: list
+        '''
+        return self._tree.find_many(items, presorted)
+
+    def height(self):
+        '''
+        Return the height of tree.
+        :return: int
+        '''
+        return self._tree.height()
+
+    def is_balanced(self):
+        '''
+        Return True if tree is balanced.
+        :return: bool
+        '''
+        return self._tree.is_balanced()
+
+    def range_find(self, low, high):
+        '''
+        Returns a list of the items in the tree, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: list
+        '''
+        return self._tree.range_find(low, high)
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items of the tree, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: iterator
+        '''
+        return self._tree.iter_range(low, high)
+
+    def prefix_items(self, prefix, limit=None):
+        '''
+        Lazily yields the items starting with prefix, in sorted order;
+        at most limit of them if limit is given.
+        :param prefix: str
+        :param limit: int or None
+        :return: iterator
+        '''
+        return self._tree.prefix_items(prefix, limit)
+
+    def successor(self, item):
+        """
+        Returns the smallest item that is larger than
+        item, or None if there is no such item.
+        """
+        return self._tree.successor(item)
+
+    def predecessor(self, item):
+        """
+        Returns the largest item that is smaller than
+        item, or None if there is no such item.
+        """
+        return self._tree.predecessor(item)
+
+    def rank(self, item):
+        '''
+        Return the number of items in the tree that are smaller than item.
+        :param item:
+        :return: int
+        '''
+        return self._tree.rank(item)
+
+    def select(self, index):
+        '''
+        Return the item at position index (counting from 0) of the
+        inorder traversal.
+        :param index: int
+        :return: item
+        '''
+        return self._tree.select(index)
+
+    def count_range(self, low, high):
+        '''
+        Return the number of items in the tree, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: int
+        '''
+        return self._tree.count_range(low, high)
+
+    def freeze(self):
+        '''
+        Return an immutable, read-only index with the items of self.
+        :return: FrozenBST
+        '''
+        return self._tree.freeze()
+
+    # Mutator methods
+    def clear(self):
+        """Makes self become empty."""
+        with self._write_lock:
+            self._tree = PersistentBST(key=self._tree.key)
+
+    def add(self, item):
+        """Adds item to the tree."""
+        with self._write_lock:
+            draft = self._tree.snapshot()
+            draft.add(item)
+            self._tree = draft
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: item is removed from self."""
+        with self._write_lock:
+            draft = self._tree.snapshot()
+            item_removed = draft.remove(item)
+            self._tree = draft
+            return item_removed
+
+    def remove_many(self, items):
+        '''
+        Removes one occurrence of every item of items that is in self
+        and returns the number of items removed.
+        :param items: iterable
+        :return: int
+        '''
+        with self._write_lock:
+            draft = self._tree.snapshot()
+            removed = draft.remove_many(items)
+            self._tree = draft
+            return removed
+
+    def remove_range(self, low, high):
+        '''
+        Removes all the items, where low <= item <= high, and returns
+        their number.
+        :param low:
+        :param high:
+        :return: int
+        '''
+        with self._write_lock:
+            draft = self._tree.snapshot()
+            removed = draft.remove_range(low, high)
+            self._tree = draft
+            return removed
+
+    def replace(self, item, new_item):
+        """
+        If item is in self, replaces it with newItem and
+        returns the old item, or returns None otherwise."""
+        with self._write_lock:
+            draft = self._tree.snapshot()
+            old_data = draft.replace(item, new_item)
+            self._tree = draft
+            return old_data
+
+    def rebalance(self):
+        '''
+        Rebalances the tree.
+        :return: self
+        '''
+        with self._write_lock:
+            draft = self._tree.snapshot()
+            draft.rebalance()
+            self._tree = draft
+        return self
@@ -0,0 +1,670 @@
+"""
+File: diskbplustree.py
+Disk-resident B+tree offering the interface of LinkedBST.
+
+The tree lives in a file of fixed-size pages that is memory-mapped.
+Page 0 holds the metadata; every other page is a node:
+    header   node type (1 byte), number of keys (2 bytes),
+             next leaf, previous leaf (4 bytes each, 0 for none)
+    keys     each a type byte followed by the key:
+             b"s" - length (2 bytes) and UTF-8 bytes
+             b"q" - signed 8-byte integer
+             b"d" - 8-byte float
+    children page numbers (4 bytes each), internal nodes only
+Items live in the leaves, which are chained in sorted order, so a
+lookup reads O(log_B n) pages and a range scan reads leaves one after
+another. At most cache_pages decoded pages are kept in memory.
+"""
+
+from abstractcollection import AbstractCollection
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+import mmap
+import os
+import struct
+
+MAGIC = b"BPT1"
+META = struct.Struct("<4sIIIIQI")
+NODE_HEADER = struct.Struct("<BHII")
+LEAF = 1
+INTERNAL = 2
+NO_PAGE = 0
+# Pages are filled up to this share of their size by bulk loading,
+# leaving room for later inserts
+FILL_FACTOR = 0.9
+
+
+class _Page(object):
+    """A decoded node page."""
+
+    __slots__ = ("leaf", "keys", "children", "next", "prev", "nbytes")
+
+    def __init__(self, leaf, keys=None, children=None):
+        self.leaf = leaf
+        self.keys = keys if keys is not None else []
+        self.children = children if children is not None else []
+        self.next = NO_PAGE
+        self.prev = NO_PAGE
+        self.nbytes = NODE_HEADER.size
+
+
+def _key_size(key):
+    """
+    Return the number of bytes key takes in a page.
+    """
+    if isinstance(key, str):
+        return 3 + len(key.encode('utf-8'))
+    return 9
+
+
+def _encode_key(key):
+    """
+    Return the bytes of key in a page.
+    Raises: TypeError if key is not a str, int or float.
+    """
+    if isinstance(key, str):
+        data = key.encode('utf-8')
+        return b"s" + struct.pack("<H", len(data)) + data
+    if isinstance(key, int):
+        return b"q" + struct.pack("<q", key)
+    if isinstance(key, float):
+        return b"d" + struct.pack("<d", key)
+    raise TypeError("Only str, int and float items can be stored on disk.")
+
+
+class DiskBPlusTree(AbstractCollection):
+    """A B+tree stored in a memory-mapped file of pages.
+    An existing file is opened as it is; sourceCollection, if present,
+    replaces its contents. Call close() (or use the tree in a with
+    statement) to write everything back to the file."""
+
+    def __init__(self, path, sourceCollection=None, page_size=4096,
+                 cache_pages=256):
+        """Opens or creates the tree file at path, keeping at most
+        cache_pages decoded pages in memory."""
+        if cache_pages < 8:
+            raise ValueError("The page cache needs at least 8 pages.")
+        self._path = path
+        self._page_size = page_size
+        self._cache_pages = cache_pages
+        self._cache = OrderedDict()
+        self._dirty = set()
+        # True while add holds pages that must stay in the cache
+        self._pinned = False
+        AbstractCollection.__init__(self)
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._file = open(path, 'r+b' if exists else 'w+b')
+        if exists:
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._read_meta()
+        else:
+            self._file.truncate(16 * page_size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+            self._reset()
+        if sourceCollection:
+            self._bulk_load(sorted(sourceCollection))
+
+    # Accessor methods
+    def __iter__(self):
+        """Supports an inorder traversal on a view of self."""
+        return self.inorder()
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self,
+        reading the chained leaves one after another."""
+        page_id = self._first_leaf
+        while page_id != NO_PAGE:
+            page = self._page(page_id)
+            keys = list(page.keys)
+            page_id = page.next
+            for key in keys:
+                yield key
+
+    def __contains__(self, item):
+        """Returns True if target is found or False otherwise."""
+        return self.find(item) is not None
+
+    def find(self, item):
+        """If item matches an item in self, returns the
+        matched item, or None otherwise."""
+        page_id, index = self._lower_bound(item)
+        if page_id != NO_PAGE:
+            key = self._page(page_id).keys[index]
+            if key == item:
+                return key
+        return None
+
+    def height(self):
+        '''
+        Return the height of tree, counted in pages below the root.
+        :return: int
+        '''
+        return self._levels - 1
+
+    def range_find(self, low, high):
+        '''
+        Returns a list of the items in the tree, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: list
+        '''
+        return list(self.iter_range(low, high))
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items of the tree, where low <= item <= high,
+        in sorted order, reading the leaves sequentially.
+        :param low:
+        :param high:
+        :return: iterator
+        '''
+        page_id, index = self._lower_bound(low)
+        while page_id != NO_PAGE:
+            page = self._page(page_id)
+            keys = page.keys[index:]
+            page_id = page.next
+            index = 0
+            for key in keys:
+                if key > high:
+                    return
+                yield key
+
+    def successor(self, item):
+        """
+        Returns the smallest item that is larger than
+        item, or None if there is no such item.
+        """
+        page = self._page(self._root)
+        while not page.leaf:
+            page = self._page(page.children[bisect_right(page.keys, item)])
+        index = bisect_right(page.keys, item)
+        while index == len(page.keys):
+            if page.next == NO_PAGE:
+                return None
+            page = self._page(page.next)
+            index = 0
+        return page.keys[index]
+
+    def predecessor(self, item):
+        """
+        Returns the largest item that is smaller than
+        item, or None if there is no such item.
+        """
+        page = self._page(self._root)
+        while not page.leaf:
+            page = self._page(page.children[bisect_left(page.keys, item)])
+        index = bisect_left(page.keys, item)
+        while index == 0:
+            if page.prev == NO_PAGE:
+                return None
+            page = self._page(page.prev)
+            index = len(page.keys)
+        return page.keys[index - 1]
+
+    # Mutator methods
+    def clear(self):
+        """Makes self become empty."""
+        self._reset()
+
+    def add(self, item):
+        """Adds item to the tree, splitting full pages on the way back."""
+        self._check_item(item)
+        self._pinned = True
+        try:
+            self._insert(item)
+        finally:
+            self._pinned = False
+        self._size += 1
+        self._trim_cache()
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: item is removed from self.
+        A leaf left empty is unlinked from the chain and from its
+        parent, so no lookup walks through empty leaves; pages left
+        underfull are not merged, and rebalance() packs them."""
+        self._pinned = True
+        try:
+            item_removed = self._delete(item)
+        finally:
+            self._pinned = False
+        self._size -= 1
+        self._trim_cache()
+        return item_removed
+
+    def replace(self, item, new_item):
+        """
+        If item is in self, replaces it with newItem and
+        returns the old item, or returns None otherwise.
+        new_item is checked first, so a failing replace leaves
+        self unchanged."""
+        self._check_item(new_item)
+        if self.find(item) is None:
+            return None
+        old_data = self.remove(item)
+        self.add(new_item)
+        return old_data
+
+    def rebalance(self):
+        '''
+        Rewrites the tree with full pages, releasing the space of
+        removed items.
+        :return: self
+        '''
+        self._bulk_load(list(self.inorder()))
+        return self
+
+    def flush(self):
+        """Writes all changed pages and the metadata to the file."""
+        for page_id in list(self._dirty):
+            self._write_page(page_id, self._cache[page_id])
+        self._dirty.clear()
+        self._write_meta()
+        self._map.flush()
+
+    def close(self):
+        """Writes everything back and closes the file."""
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Helper methods
+    def _lower_bound(self, item):
+        '''
+        Return (page number, index) of the first item that is not
+        smaller than item, or (NO_PAGE, 0) if there is none.
+        :param item:
+        :return: tuple
+        '''
+        page_id = self._root
+        page = self._page(page_id)
+        while not page.leaf:
+            page_id = page.children[bisect_left(page.keys, item)]
+            page = self._page(page_id)
+        index = bisect_left(page.keys, item)
+        while index == len(page.keys):
+            if page.next == NO_PAGE:
+                return NO_PAGE, 0
+            page_id = page.next
+            page = self._page(page_id)
+            index = 0
+        return page_id, index
+
+    def _check_item(self, item):
+        '''
+        Makes sure item can be stored in a page.
+        Raises: TypeError if its type is not supported, or ValueError
+        if it is too large for a page.
+        :param item:
+        '''
+        if _key_size(item) > self._page_size // 4:
+            raise ValueError("Item is too large for a page.")
+        _encode_key(item)
+
+    def _insert(self, item):
+        '''
+        Inserts item into its leaf and splits the overfull pages on the
+        way back up. The pages on the path are held across the splits,
+        so add runs it with the cache pinned.
+        :param item:
+        '''
+        path = []
+        page_id = self._root
+        page = self._page(page_id)
+        while not page.leaf:
+            index = bisect_right(page.keys, item)
+            path.append((page_id, index))
+            page_id = page.children[index]
+            page = self._page(page_id)
+        page.keys.insert(bisect_right(page.keys, item), item)
+        page.nbytes += _key_size(item)
+        self._dirty.add(page_id)
+        while page.nbytes > self._page_size:
+            separator, right_id = self._split(page_id, page)
+            if path:
+                page_id, index = path.pop()
+                page = self._page(page_id)
+                page.keys.insert(index, separator)
+                page.children.insert(index + 1, right_id)
+                page.nbytes += _key_size(separator) + 4
+                self._dirty.add(page_id)
+            else:
+                root = _Page(False, [separator], [page_id, right_id])
+                root.nbytes += _key_size(separator) + 8
+                self._root = self._allocate(root)
+                self._levels += 1
+                break
+
+    def _delete(self, item):
+        '''
+        Removes item from its leaf and drops the leaf if it is left
+        empty. Pages on the path are held throughout, so remove runs
+        it with the cache pinned.
+        Raises: KeyError if item is not in self.
+        :param item:
+        :return: the removed item
+        '''
+        path = []
+        page_id = self._root
+        page = self._page(page_id)
+        while not page.leaf:
+            index = bisect_left(page.keys, item)
+            path.append((page_id, index))
+            page_id = page.children[index]
+            page = self._page(page_id)
+        index = bisect_left(page.keys, item)
+        if index == len(page.keys) and page.next != NO_PAGE:
+            # Leaves are never empty, so item can only be first in the next one
+            page_id = self._next_leaf(path)
+            page = self._page(page_id)
+            index = 0
+        if index == len(page.keys) or page.keys[index] != item:
+            raise KeyError("Item not in tree.")
+        item_removed = page.keys.pop(index)
+        page.nbytes -= _key_size(item_removed)
+        self._dirty.add(page_id)
+        if not page.keys and path:
+            self._drop_leaf(path, page_id, page)
+        return item_removed
+
+    def _next_leaf(self, path):
+        '''
+        Moves path, the internal pages above a leaf with the index of
+        the child taken in each, on to the next leaf, and returns the
+        number of that leaf.
+        :param path: list of tuples (page number, index)
+        :return: int
+        '''
+        while True:
+            page_id, index = path.pop()
+            page = self._page(page_id)
+            if index + 1 < len(page.children):
+                path.append((page_id, index + 1))
+                child_id = page.children[index + 1]
+                break
+        child = self._page(child_id)
+        while not child.leaf:
+            path.append((child_id, 0))
+            child_id = child.children[0]
+            child = self._page(child_id)
+        return child_id
+
+    def _drop_leaf(self, path, leaf_id, leaf):
+        '''
+        Unlinks the empty leaf from the chain of leaves and from its
+        parent, dropping the ancestors left without children and the
+        roots left with a single one. Dropped pages stay unused in the
+        file until rebalance() rewrites it.
+        :param path: list of tuples (page number, index) above the leaf
+        :param leaf_id: int
+        :param leaf: _Page
+        '''
+        if leaf.prev == NO_PAGE:
+            self._first_leaf = leaf.next
+        else:
+            self._page(leaf.prev).next = leaf.next
+            self._dirty.add(leaf.prev)
+        if leaf.next != NO_PAGE:
+            self._page(leaf.next).prev = leaf.prev
+            self._dirty.add(leaf.next)
+        self._release(leaf_id)
+        while path:
+            page_id, index = path.pop()
+            page = self._page(page_id)
+            del page.children[index]
+            if page.keys:
+                del page.keys[max(index - 1, 0)]
+            if page.children:
+                self._measure(page)
+                self._dirty.add(page_id)
+                break
+            self._release(page_id)
+        root = self._page(self._root)
+        while not root.leaf and len(root.children) == 1:
+            self._release(self._root)
+            self._root = root.children[0]
+            self._levels -= 1
+            root = self._page(self._root)
+
+    def _release(self, page_id):
+        '''
+        Forgets the page page_id, which is no longer part of the tree.
+        :param page_id: int
+        '''
+        self._cache.pop(page_id, None)
+        self._dirty.discard(page_id)
+
+    def _split(self, page_id, page):
+        '''
+        Moves the upper half (by bytes) of an overfull page to a new
+        page and returns (separator, new page number).
+        :param page_id: int
+        :param page: _Page
+        :return: tuple
+        '''
+        sizes = [_key_size(key) + (0 if page.leaf else 4) for key in page.keys]
+        half = sum(sizes) // 2
+        middle = 0
+        taken = 0
+        while taken + sizes[middle] <= half:
+            taken += sizes[middle]
+            middle += 1
+        middle = max(1, min(middle, len(page.keys) - 1))
+        if page.leaf:
+            right = _Page(True, page.keys[middle:])
+            separator = right.keys[0]
+            del page.keys[middle:]
+            right.next = page.next
+            right.prev = page_id
+            right_id = self._allocate(right)
+            if page.next != NO_PAGE:
+                following = self._page(page.next)
+                following.prev = right_id
+                self._dirty.add(page.next)
+            page.next = right_id
+        else:
+            separator = page.keys[middle]
+            right = _Page(False, page.keys[middle + 1:],
+                          page.children[middle + 1:])
+            del page.keys[middle:]
+            del page.children[middle + 1:]
+            right_id = self._allocate(right)
+        self._measure(page)
+        self._measure(right)
+        self._dirty.add(page_id)
+        return separator, right_id
+
+    def _bulk_load(self, sorted_keys):
+        '''
+        Replaces the contents of self with sorted_keys, packing them
+        into leaves and building the internal levels bottom-up.
+        :param sorted_keys: list, in ascending order
+        '''
+        self._reset()
+        limit = int(self._page_size * FILL_FACTOR)
+        leaf_id = self._root
+        leaf = self._page(leaf_id)
+        level = [(leaf_id, None)]
+        for key in sorted_keys:
+            size = _key_size(key)
+            if size > self._page_size // 4:
+                raise ValueError("Item is too large for a page.")
+            if leaf.keys and leaf.nbytes + size > limit:
+                new_leaf = _Page(True)
+                new_leaf.prev = leaf_id
+                new_id = self._allocate(new_leaf)
+                leaf.next = new_id
+                self._dirty.add(leaf_id)
+                leaf_id, leaf = new_id, new_leaf
+                level.append((leaf_id, key))
+                self._trim_cache()
+            _encode_key(key)
+            leaf.keys.append(key)
+            leaf.nbytes += size
+        self._dirty.add(leaf_id)
+        self._size = len(sorted_keys)
+        while len(level) > 1:
+            upper = []
+            page = None
+            for child_id, first_key in level:
+                if page is None or page.nbytes + _key_size(first_key) + 4 > limit:
+                    page = _Page(False, [], [child_id])
+                    page.nbytes += 4
+                    upper.append((self._allocate(page), first_key))
+                    self._trim_cache()
+                else:
+                    page.keys.append(first_key)
+                    page.children.append(child_id)
+                    page.nbytes += _key_size(first_key) + 4
+            level = upper
+            self._levels += 1
+        self._root = level[0][0]
+        self._trim_cache()
+
+    def _reset(self):
+        '''
+        Makes the file hold an empty tree: the metadata and one leaf.
+        '''
+        self._cache.clear()
+        self._dirty.clear()
+        self._page_count = 1
+        self._size = 0
+        self._levels = 1
+        self._root = self._first_leaf = self._allocate(_Page(True))
+        self._write_meta()
+
+    def _allocate(self, page):
+        '''
+        Return the number of a new page holding page.
+        :param page: _Page
+        :return: int
+        '''
+        page_id = self._page_count
+        self._page_count += 1
+        needed = self._page_count * self._page_size
+        if needed > len(self._map):
+            self._map.flush()
+            self._map.close()
+            self._file.truncate(max(needed, 2 * os.path.getsize(self._path)))
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._cache[page_id] = page
+        self._dirty.add(page_id)
+        return page_id
+
+    def _page(self, page_id):
+        '''
+        Return the decoded page page_id, through the page cache. A page
+        read from the file evicts the least recently used ones, unless
+        an add in progress has pinned the cache.
+        :param page_id: int
+        :return: _Page
+        '''
+        page = self._cache.get(page_id)
+        if page is None:
+            page = self._read_page(page_id)
+            self._cache[page_id] = page
+            if not self._pinned:
+                self._trim_cache()
+        else:
+            self._cache.move_to_end(page_id)
+        return page
+
+    def _trim_cache(self):
+        '''
+        Evicts the least recently used pages over the cache size,
+        writing changed ones back to the file first.
+        '''
+        while len(self._cache) > self._cache_pages:
+            page_id, page = self._cache.popitem(last=False)
+            if page_id in self._dirty:
+                self._write_page(page_id, page)
+                self._dirty.discard(page_id)
+
+    @staticmethod
+    def _measure(page):
+        '''
+        Recomputes the number of bytes page takes.
+        :param page: _Page
+        '''
+        page.nbytes = NODE_HEADER.size + 4 * len(page.children) + \
+            sum(_key_size(key) for key in page.keys)
+
+    def _read_page(self, page_id):
+        '''
+        Decode page page_id from the file.
+        :param page_id: int
+        :return: _Page
+        '''
+        offset = page_id * self._page_size
+        data = self._map[offset:offset + self._page_size]
+        kind, count, next_id, prev_id = NODE_HEADER.unpack_from(data)
+        page = _Page(kind == LEAF)
+        page.next = next_id
+        page.prev = prev_id
+        position = NODE_HEADER.size
+        keys = page.keys
+        for _ in range(count):
+            tag = data[position:position + 1]
+            if tag == b"s":
+                length, = struct.unpack_from("<H", data, position + 1)
+                keys.append(data[position + 3:position + 3 + length].decode('utf-8'))
+                position += 3 + length
+            elif tag == b"q":
+                keys.append(struct.unpack_from("<q", data, position + 1)[0])
+                position += 9
+            else:
+                keys.append(struct.unpack_from("<d", data, position + 1)[0])
+                position += 9
+        if not page.leaf:
+            page.children = list(struct.unpack_from(
+                "<%dI" % (count + 1), data, position))
+            position += 4 * (count + 1)
+        page.nbytes = position
+        return page
+
+    def _write_page(self, page_id, page):
+        '''
+        Encode page into its place in the file.
+        :param page_id: int
+        :param page: _Page
+        '''
+        parts = [NODE_HEADER.pack(LEAF if page.leaf else INTERNAL,
+                                  len(page.keys), page.next, page.prev)]
+        parts.extend(_encode_key(key) for key in page.keys)
+        if not page.leaf:
+            parts.append(struct.pack("<%dI" % len(page.children),
+                                     *page.children))
+        data = b"".join(parts)
+        offset = page_id * self._page_size
+        self._map[offset:offset + len(data)] = data
+
+    def _read_meta(self):
+        '''
+        Loads the metadata from page 0.
+        Raises: ValueError if the file is not a B+tree file.
+        '''
+        magic, page_size, root, first_leaf, page_count, size, levels = \
+            META.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a B+tree file.")
+        self._page_size = page_size
+        self._root = root
+        self._first_leaf = first_leaf
+        self._page_count = page_count
+        self._size = size
+        self._levels = levels
+
+    def _write_meta(self):
+        '''
+        Stores the metadata in page 0.
+        '''
+        META.pack_into(self._map, 0, MAGIC, self._page_size, self._root,
+                       self._first_leaf, self._page_count, self._size,
+                       self._levels)
@@ -0,0 +1,180 @@
+"""
+File: frozenbst.py
+Read-only search index produced by LinkedBST.freeze().
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class FrozenBST(object):
+    """An immutable snapshot of a binary search tree.
+    The items are held in one sorted tuple, so every search is a
+    binary search over contiguous memory done by the bisect module
+    instead of a chain of node dereferences. Nothing can change
+    after construction, so one index may be shared between threads
+    without any locking."""
+
+    __slots__ = ("_items", "_keys", "_key")
+
+    def __init__(self, sorted_items=(), key=None):
+        """Sets the items of the index.
+        Precondition: sorted_items are in ascending order (of key(item),
+        if key is given). The keys are computed once and kept in a
+        second tuple that the searches run on."""
+        self._items = tuple(sorted_items)
+        self._key = key
+        if key is None:
+            self._keys = self._items
+        else:
+            self._keys = tuple(map(key, self._items))
+
+    # Accessor methods
+    @property
+    def key(self):
+        """The key function ordering the items, or None."""
+        return self._key
+
+    def _key_of(self, item):
+        """Returns what the searches compare for item."""
+        if self._key is None:
+            return item
+        return self._key(item)
+
+    def __len__(self):
+        """Returns the number of items in self."""
+        return len(self._items)
+
+    def isEmpty(self):
+        """Returns True if len(self) == 0, or False otherwise."""
+        return not self._items
+
+    def __iter__(self):
+        """Supports an inorder traversal on a view of self."""
+        return iter(self._items)
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self."""
+        return iter(self._items)
+
+    def __str__(self):
+        """Returns the string representation of self."""
+        return "[" + ", ".join(map(str, self._items)) + "]"
+
+    def __eq__(self, other):
+        """Returns True if self equals other,
+        or False otherwise."""
+        if self is other:
+            return True
+        if type(self) != type(other):
+            return False
+        return self._items == other._items
+
+    def __contains__(self, item):
+        """Returns True if target is found or False otherwise."""
+        return self.find(item) is not None
+
+    def find(self, item):
+        """If item matches an item in self, returns the
+        matched item, or None otherwise."""
+        key = self._key_of(item)
+        index = bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            return self._items[index]
+        return None
+
+    def find_many(self, items):
+        '''
+        Returns the list of what find would return for each of items.
+        :param items: iterable
+        :return: list
+        '''
+        return [self.find(item) for item in items]
+
+    def range_find(self, low, high):
+        '''
+        Returns a list of the items, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: list
+        '''
+        return list(self.iter_range(low, high))
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items, where low <= item <= high, in order.
+        :param low:
+        :param high:
+        :return: iterator
+        '''
+        first = bisect_left(self._keys, self._key_of(low))
+        last = bisect_right(self._keys, self._key_of(high))
+        for index in range(first, last):
+            yield self._items[index]
+
+    def prefix_items(self, prefix, limit=None):
+        '''
+        Lazily yields the items starting with prefix, in order; at most
+        limit of them if limit is given.
+        :param prefix: str
+        :param limit: int or None
+        :return: iterator
+        '''
+        prefix = self._key_of(prefix)
+        index = bisect_left(self._keys, prefix)
+        last = len(self._keys)
+        if limit is not None:
+            last = min(last, index + max(limit, 0))
+        while index < last and self._keys[index].startswith(prefix):
+            yield self._items[index]
+            index += 1
+
+    def successor(self, item):
+        """
+        Returns the smallest item that is larger than
+        item, or None if there is no such item.
+        """
+        index = bisect_right(self._keys, self._key_of(item))
+        if index < len(self._items):
+            return self._items[index]
+        return None
+
+    def predecessor(self, item):
+        """
+        Returns the largest item that is smaller than
+        item, or None if there is no such item.
+        """
+        index = bisect_left(self._keys, self._key_of(item))
+        if index > 0:
+            return self._items[index - 1]
+        return None
+
+    def rank(self, item):
+        '''
+        Return the number of items that are smaller than item.
+        :param item:
+        :return: int
+        '''
+        return bisect_left(self._keys, self._key_of(item))
+
+    def select(self, index):
+        '''
+        Return the item at position index (counting from 0).
+        Raises: IndexError if index is out of range.
+        :param index: int
+        :return: item
+        '''
+        if not 0 <= index < len(self._items):
+            raise IndexError("Tree index out of range.")
+        return self._items[index]
+
+    def count_range(self, low, high):
+        '''
+        Return the number of items, where low <= item <= high.
+        :param low:
+        :param high:
+        :return: int
+        '''
+        low, high = self._key_of(low), self._key_of(high)
+        if high < low:
+            return 0
+        return bisect_right(self._keys, high) - bisect_left(self._keys, low)
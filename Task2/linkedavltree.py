@@ -0,0 +1,77 @@
+"""
+File: linkedavltree.py
+Self-balancing (AVL) version of the link-based binary search tree.
+"""
+
+from linkedbst import LinkedBST
+
+
+class LinkedAVLTree(LinkedBST):
+    """A link-based binary search tree that keeps itself balanced.
+    After every add and remove the heights of the two subtrees of
+    each node differ by at most one, so the height of the tree stays
+    O(log n) even when items arrive in sorted order."""
+
+    def __init__(self, sourceCollection=None, key=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present, ordered
+        by key(item) if key is given."""
+        LinkedBST.__init__(self, sourceCollection, key)
+
+    def _retrace(self, path):
+        '''
+        Walks the changed path bottom-up, refreshing heights and
+        rotating every node that has become unbalanced.
+        :param path: list of BSTNode, from the root down
+        '''
+        for index in range(len(path) - 1, -1, -1):
+            node = path[index]
+            top = self._balance(node)
+            if top is not node:
+                if index == 0:
+                    self._root = top
+                elif path[index - 1].left is node:
+                    path[index - 1].left = top
+                else:
+                    path[index - 1].right = top
+
+    def _join(self, left, node, right):
+        '''
+        Returns the root of a balanced tree made of the subtree left,
+        node and the subtree right (all items of left come first).
+        node is hung where the spine of the taller tree reaches the
+        height of the other one and the spine is rebalanced on the way
+        back, which costs O(|height(left) - height(right)| + 1).
+        :param left: BSTNode or None
+        :param node: BSTNode
+        :param right: BSTNode or None
+        :return: BSTNode
+        '''
+        if self._height(left) > self._height(right) + 1:
+            left = self._own(left)
+            left.right = self._join(left.right, node, right)
+            return self._balance(left)
+        if self._height(right) > self._height(left) + 1:
+            right = self._own(right)
+            right.left = self._join(left, node, right.left)
+            return self._balance(right)
+        return LinkedBST._join(self, left, node, right)
+
+    def _balance(self, node):
+        '''
+        Restores the AVL property at node, whose children are
+        already balanced.
+        :param node: BSTNode
+        :return: BSTNode, the root of the repaired subtree
+        '''
+        self._refresh(node)
+        skew = self._height(node.left) - self._height(node.right)
+        if skew > 1:
+            if self._height(node.left.left) < self._height(node.left.right):
+                node.left = self._rotate_left(node.left)
+            return self._rotate_right(node)
+        if skew < -1:
+            if self._height(node.right.right) < self._height(node.right.left):
+                node.right = self._rotate_right(node.right)
+            return self._rotate_left(node)
+        return node
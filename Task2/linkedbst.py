@@ -4,22 +4,47 @@ Author: Ken Lambert
 """
 
 from abstractcollection import AbstractCollection
+from bloomfilter import BloomFilter
 from bstnode import BSTNode
+import bstformat
+from frozenbst import FrozenBST
+from lrucache import LRUCache
 from linkedstack import LinkedStack
 from linkedqueue import LinkedQueue
 from math import log
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from sys import getsizeof
 import time
 from random import sample, choice
 
+# Where an item comes from when two trees are walked side by side
+LEFT_ONLY, RIGHT_ONLY, BOTH = "left", "right", "both"
+# Marks an exhausted traversal
+_END = object()
+
 
 class LinkedBST(AbstractCollection):
     """An link-based binary search tree implementation."""
 
-    def __init__(self, sourceCollection=None):
+    def __init__(self, sourceCollection=None, key=None):
         """Sets the initial state of self, which includes the
-        contents of sourceCollection, if it's present."""
+        contents of sourceCollection, if it's present.
+        The contents are linked into a balanced tree in one pass
+        instead of being added one by one.
+        If key is given, items are ordered by key(item), as in
+        sorted(key=...): the key is computed once per node and kept
+        there, so descents compare the stored keys. Searches apply
+        key to the items they are given as well."""
         self._root = None
-        AbstractCollection.__init__(self, sourceCollection)
+        self._cache = None
+        self._bloom = None
+        # Items removed since the Bloom filter was last built
+        self._bloom_removals = 0
+        self._key = key
+        AbstractCollection.__init__(self)
+        if sourceCollection:
+            self._build(sourceCollection)
 
     # Accessor methods
     def __str__(self):
@@ -39,127 +64,511 @@ class LinkedBST(AbstractCollection):
 
     def __iter__(self):
         """Supports a preorder traversal on a view of self."""
+        for node in self._preorder_nodes():
+            yield node.data
+
+    def preorder(self):
+        """Supports a preorder traversal on a view of self.
+        Items are produced lazily, using a stack of at most
+        O(height) nodes and no recursion."""
+        return self.__iter__()
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self.
+        Items are produced lazily, using a stack of at most
+        O(height) nodes and no recursion."""
+        for node in self._inorder_nodes():
+            yield node.data
+
+    def postorder(self):
+        """Supports a postorder traversal on a view of self.
+        Items are produced lazily, using a stack of at most
+        O(height) nodes and no recursion."""
+        for node in self._postorder_nodes():
+            yield node.data
+
+    def levelorder(self):
+        """Supports a levelorder traversal on a view of self.
+        Items are produced lazily; the queue holds at most two
+        levels of the tree at a time."""
+        for node in self._levelorder_nodes():
+            yield node.data
+
+    def _preorder_nodes(self):
+        """Yields the nodes of self in preorder."""
         if not self.isEmpty():
             stack = LinkedStack()
             stack.push(self._root)
             while not stack.isEmpty():
                 node = stack.pop()
-                yield node.data
+                yield node
                 if node.right != None:
                     stack.push(node.right)
                 if node.left != None:
                     stack.push(node.left)
 
-    def preorder(self):
-        """Supports a preorder traversal on a view of self."""
-        lyst = list()
-
-        def recurse(node):
-            if node != None:
-                lyst.append(node.data)
-                recurse(node.left)
-                recurse(node.right)
-
-        recurse(self._root)
-        return iter(lyst)
+    def _inorder_nodes(self):
+        """Yields the nodes of self in inorder."""
+        stack = LinkedStack()
+        node = self._root
+        while node is not None or not stack.isEmpty():
+            # Go down to the leftmost node not visited yet
+            while node is not None:
+                stack.push(node)
+                node = node.left
+            node = stack.pop()
+            yield node
+            node = node.right
 
-    def inorder(self):
-        """Supports an inorder traversal on a view of self."""
-        lyst = list()
-
-        def recurse(node):
-            if node != None:
-                recurse(node.left)
-                lyst.append(node.data)
-                recurse(node.right)
-
-        recurse(self._root)
-        return iter(lyst)
-
-    def postorder(self):
-        """Supports a postorder traversal on a view of self."""
-        lyst = list()
-
-        def recurse(node):
-            if node != None:
-                recurse(node.left)
-                recurse(node.right)
-                lyst.append(node.data)
-
-        recurse(self._root)
-        return iter(lyst)
+    def _postorder_nodes(self):
+        """Yields the nodes of self in postorder."""
+        stack = LinkedStack()
+        node = self._root
+        last_visited = None
+        while node is not None or not stack.isEmpty():
+            if node is not None:
+                stack.push(node)
+                node = node.left
+            else:
+                top = stack.peek()
+                # Visit the right subtree first, unless it is just done
+                if top.right is not None and top.right is not last_visited:
+                    node = top.right
+                else:
+                    yield top
+                    last_visited = stack.pop()
 
-    def levelorder(self):
-        """Supports a levelorder traversal on a view of self."""
-        lyst = list()
+    def _levelorder_nodes(self):
+        """Yields the nodes of self in levelorder."""
         queue = LinkedQueue()
-
-        def recurse():
-            if not queue.isEmpty():
-                node = queue.pop()
-                lyst.append(node.data)
-                if node.left is not None:
-                    queue.add(node.left)
-                if node.right is not None:
-                    queue.add(node.right)
-                recurse()
-
         if self._root is not None:
             queue.add(self._root)
-        recurse()
-        return iter(lyst)
+        while not queue.isEmpty():
+            node = queue.pop()
+            yield node
+            if node.left is not None:
+                queue.add(node.left)
+            if node.right is not None:
+                queue.add(node.right)
 
     def __contains__(self, item):
         """Returns True if target is found or False otherwise."""
         return self.find(item) != None
 
+    @property
+    def key(self):
+        """The key function ordering the items, or None."""
+        return self._key
+
+    def _key_of(self, item):
+        """Returns what the nodes compare for item."""
+        if self._key is None:
+            return item
+        return self._key(item)
+
     def find(self, item):
         """If item matches an item in self, returns the
         matched item, or None otherwise.
-        !!! Usage of different method (without recursion)."""
+        Definite misses are answered by the Bloom filter and the rest
+        go through the lookup cache, if these are enabled."""
+        if self._cache is None and self._bloom is None:
+            return self._find(item)
+        key = self._key_of(item)
+        if self._bloom is not None and key not in self._bloom:
+            return None
+        if self._cache is None:
+            return self._find(item)
+        found = self._cache.get(key, _END)
+        if found is _END:
+            found = self._find(item)
+            self._cache.put(key, found)
+        return found
 
+    def _find(self, item):
+        """Looks item up in the tree itself.
+        !!! Usage of different method (without recursion)."""
+        key = item if self._key is None else self._key(item)
         probe = self._root
         while probe is not None:
-            if probe.data < item:
+            if probe.key < key:
                 probe = probe.right
-            elif probe.data > item:
+            elif probe.key > key:
                 probe = probe.left
             else:
                 return probe.data
         return None
 
+    def find_many(self, items, presorted=False):
+        '''
+        Looks up every item of items and returns the list of what
+        find would return for each of them, in input order.
+        The batch is sorted once (pass presorted=True to skip that
+        for input already in order) and resolved in a single walk of
+        the tree: each node splits the sorted queries reaching it
+        into those going left and those going right, so neighbouring
+        queries share one descent instead of restarting from the root.
+        :param items: iterable
+        :param presorted: bool
+        :return: list
+        '''
+        items = list(items)
+        if self._key is not None:
+            items = [self._key(item) for item in items]
+        if presorted:
+            order = range(len(items))
+            queries = items
+        else:
+            order = sorted(range(len(items)), key=items.__getitem__)
+            queries = [items[index] for index in order]
+        results = [None] * len(items)
+        pending = []
+        if self._root is not None and queries:
+            pending.append((self._root, 0, len(queries)))
+        while pending:
+            node, low, high = pending.pop()
+            if high - low == 1:
+                # A lone query finishes with an ordinary descent
+                key = queries[low]
+                while node is not None:
+                    if node.key < key:
+                        node = node.right
+                    elif node.key > key:
+                        node = node.left
+                    else:
+                        results[order[low]] = node.data
+                        break
+                continue
+            first = bisect_left(queries, node.key, low, high)
+            last = bisect_right(queries, node.key, first, high)
+            for index in range(first, last):
+                results[order[index]] = node.data
+            if low < first and node.left is not None:
+                pending.append((node.left, low, first))
+            if last < high and node.right is not None:
+                pending.append((node.right, last, high))
+        return results
+
+    def bytes_per_node(self):
+        '''
+        Return the memory taken by the tree structure per item:
+        one BSTNode each, the items themselves excluded.
+        :return: float
+        '''
+        if self._root is None:
+            return 0.0
+        return float(getsizeof(self._root))
+
+    def enable_cache(self, maxsize=1024):
+        '''
+        Puts a cache of the results of the last maxsize different
+        lookups, found or not, in front of find and `in`. The items
+        (or their keys) must be hashable. Every mutator keeps the cache correct.
+        :param maxsize: int
+        '''
+        self._cache = LRUCache(maxsize)
+
+    def disable_cache(self):
+        '''
+        Removes the lookup cache.
+        '''
+        self._cache = None
+
+    def cache_info(self):
+        '''
+        Returns the hits, misses and evictions of the lookup cache along
+        with its size and maxsize, or None if the cache is disabled.
+        :return: dict or None
+        '''
+        if self._cache is None:
+            return None
+        return self._cache.info()
+
+    def enable_bloom(self, error_rate=0.01, capacity=None):
+        '''
+        Puts a Bloom filter of the items in front of find and `in`, so
+        that most lookups of absent items never enter the tree. The
+        filter is sized for capacity items (twice the current number
+        by default) with the given false-positive rate and takes about
+        capacity * 1.44 * log2(1 / error_rate) bits. It is rebuilt,
+        larger, when the tree outgrows it and, smaller, after half of
+        the items it holds have been removed. The items (or their
+        keys) must be hashable. It pays off when most lookups are for
+        absent items, since present ones pay for the probes as well.
+        :param error_rate: float
+        :param capacity: int or None
+        '''
+        if capacity is None:
+            capacity = 2 * self._size
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._bloom_removals = 0
+        self._fill_bloom(node.key for node in self._inorder_nodes())
+
+    def disable_bloom(self):
+        '''
+        Removes the Bloom filter.
+        '''
+        self._bloom = None
+
+    def bloom_info(self):
+        '''
+        Returns the number of keys, the capacity, the false-positive
+        rate, the number of hashes and the size in bytes of the Bloom
+        filter, or None if the filter is disabled.
+        :return: dict or None
+        '''
+        if self._bloom is None:
+            return None
+        return self._bloom.info()
+
+    def _fill_bloom(self, keys):
+        '''
+        Adds keys to the Bloom filter.
+        :param keys: iterable
+        '''
+        add = self._bloom.add
+        for key in keys:
+            add(key)
+
+    def _rebuild_bloom(self, keys=None):
+        '''
+        Replaces the Bloom filter, if it is enabled, by one sized for
+        twice the items of self and holding keys, or the keys of all
+        the nodes if keys is None.
+        :param keys: iterable or None
+        '''
+        if self._bloom is not None:
+            self._bloom = BloomFilter(2 * self._size, self._bloom.error_rate)
+            self._bloom_removals = 0
+            if keys is None:
+                keys = (node.key for node in self._inorder_nodes())
+            self._fill_bloom(keys)
+
+    def _bloom_added(self, key):
+        '''
+        Called by the mutators once an item has been inserted, with its
+        key. Adds key to the Bloom filter, if it is enabled, and
+        rebuilds the filter once it holds more keys than it was sized
+        for.
+        :param key:
+        '''
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(key)
+            if bloom.count > bloom.capacity:
+                self._rebuild_bloom()
+
+    def _bloom_removed(self, count=1):
+        '''
+        Called by the mutators once count items have been removed. A
+        removed key stays in the Bloom filter and only costs an
+        occasional false positive, so the filter is rebuilt, smaller,
+        once half of the keys it holds are of removed items.
+        :param count: int
+        '''
+        if self._bloom is not None:
+            self._bloom_removals += count
+            if 2 * self._bloom_removals > self._bloom.count:
+                self._rebuild_bloom()
+
+    def _invalidate(self, *items):
+        '''
+        Called by every mutator, before the change, with the items it
+        adds, removes or replaces, or with no items if it changes many
+        at once.
+        Drops the cached lookups of items, or of everything if no
+        items are given.
+        '''
+        if self._cache is not None:
+            if items:
+                for item in items:
+                    self._cache.discard(self._key_of(item))
+            else:
+                self._cache.clear()
+
+    def freeze(self):
+        '''
+        Return an immutable, read-only index with the items of self.
+        The index answers find, range_find, successor, predecessor,
+        rank, select and count_range by binary search over one sorted
+        tuple, and may be shared between threads without locks.
+        :return: FrozenBST
+        '''
+        return FrozenBST(self.inorder(), self._key)
+
+    def __add__(self, other):
+        """Returns a new tree containing the contents
+        of self and other, merged in O(n + m) when other
+        is a tree ordered the same way."""
+        return type(self)(list(merge(self.inorder(), self._sorted_view(other),
+                                     key=self._key)),
+                          key=self._key)
+
+    def union(self, other):
+        '''
+        Returns a new tree with the items that are in self or in other.
+        An item present several times is kept as many times as it
+        occurs in self or in other, whichever is more.
+        :param other: tree or iterable
+        :return: LinkedBST
+        '''
+        return type(self)([item for item, _ in self._pair_up(other)],
+                          key=self._key)
+
+    def intersection(self, other):
+        '''
+        Returns a new tree with the items that are in both self and other.
+        :param other: tree or iterable
+        :return: LinkedBST
+        '''
+        return type(self)([item for item, side in self._pair_up(other)
+                           if side == BOTH], key=self._key)
+
+    def difference(self, other):
+        '''
+        Returns a new tree with the items of self that are not in other.
+        :param other: tree or iterable
+        :return: LinkedBST
+        '''
+        return type(self)([item for item, side in self._pair_up(other)
+                           if side == LEFT_ONLY], key=self._key)
+
+    def symmetric_difference(self, other):
+        '''
+        Returns a new tree with the items that are in exactly one of
+        self and other.
+        :param other: tree or iterable
+        :return: LinkedBST
+        '''
+        return type(self)([item for item, side in self._pair_up(other)
+                           if side != BOTH], key=self._key)
+
+    def _pair_up(self, other):
+        '''
+        Walks the sorted items of self and other side by side, pairing
+        items with equal keys, and yields (item, side) in sorted order,
+        where side is LEFT_ONLY, RIGHT_ONLY or BOTH. Takes O(n + m)
+        comparisons.
+        :param other: tree or iterable
+        :return: iterator
+        '''
+        key_of = self._key_of
+        left = self.inorder()
+        right = self._sorted_view(other)
+        left_item = next(left, _END)
+        right_item = next(right, _END)
+        if left_item is not _END and right_item is not _END:
+            left_key = key_of(left_item)
+            right_key = key_of(right_item)
+        while left_item is not _END and right_item is not _END:
+            if left_key < right_key:
+                yield left_item, LEFT_ONLY
+                left_item = next(left, _END)
+                if left_item is not _END:
+                    left_key = key_of(left_item)
+            elif right_key < left_key:
+                yield right_item, RIGHT_ONLY
+                right_item = next(right, _END)
+                if right_item is not _END:
+                    right_key = key_of(right_item)
+            else:
+                yield left_item, BOTH
+                left_item = next(left, _END)
+                right_item = next(right, _END)
+                if left_item is not _END and right_item is not _END:
+                    left_key = key_of(left_item)
+                    right_key = key_of(right_item)
+        while left_item is not _END:
+            yield left_item, LEFT_ONLY
+            left_item = next(left, _END)
+        while right_item is not _END:
+            yield right_item, RIGHT_ONLY
+            right_item = next(right, _END)
+
+    def _sorted_view(self, other):
+        '''
+        Returns an iterator over the items of other in the order of
+        self: the inorder traversal of a tree with the same key
+        function, or else a sorted copy.
+        :param other: tree or iterable
+        :return: iterator
+        '''
+        if hasattr(other, "inorder") and \
+                getattr(other, "key", None) is self._key:
+            return other.inorder()
+        return iter(sorted(other, key=self._key))
+
+    def dump(self, path):
+        '''
+        Writes the items of self together with the exact shape of the
+        tree to the file at path in the compact format of bstformat.
+        :param path: str
+        '''
+        bstformat.dump_nodes(path, self._root)
+
+    @classmethod
+    def load(cls, path, key=None, allow_pickle=False):
+        '''
+        Returns a new tree read from the file at path, written by dump.
+        The file is memory-mapped and the tree is relinked node by node
+        in one linear pass, without comparing any items. key must be
+        the key function of the tree that was dumped.
+        Items other than str, int and float are stored pickled, and
+        unpickling a crafted file can execute arbitrary code, so such
+        files are only read if allow_pickle is True. Never allow it
+        for files from an untrusted source.
+        Raises: ValueError if the file is not a tree file, or if its
+        items are pickled and allow_pickle is False.
+        :param path: str
+        :param key: function or None
+        :param allow_pickle: bool
+        :return: LinkedBST
+        '''
+        keys, shape = bstformat.load(path, allow_pickle)
+        tree = cls(key=key)
+        tree._root = tree._relink(keys, shape)
+        tree._size = len(keys)
+        return tree
+
     # Mutator methods
     def clear(self):
         """Makes self become empty."""
         self._root = None
         self._size = 0
+        self._invalidate()
+        self._rebuild_bloom()
 
     def add(self, item):
         """Adds item to the tree.
         Important!!! It is not the same as in the first realization as 
         there are troubles with recursion."""
+        self._invalidate(item)
+        key = self._key_of(item)
         if self.isEmpty():
-            self._root = BSTNode(item)
+            self._root = BSTNode(item, key=key)
         else:
+            path = []
             probe = self._root
             while probe is not None:
-                add_probe = probe
-                if item < probe.data:
+                path.append(probe)
+                if key < probe.key:
                     probe = probe.left
                 else:
                     probe = probe.right
-            if add_probe.data < item:
-                add_probe.right = BSTNode(item)
+            add_probe = path[-1]
+            if key < add_probe.key:
+                add_probe.left = BSTNode(item, key=key)
             else:
-                add_probe.left = BSTNode(item)
+                add_probe.right = BSTNode(item, key=key)
+            self._retrace(path)
         self._size += 1
+        self._bloom_added(key)
 
     def remove(self, item):
         """Precondition: item is in self.
         Raises: KeyError if item is not in self.
-        postcondition: item is removed from self."""
-        if not item in self:
-            raise KeyError("Item not in tree.""")
+        postcondition: item is removed from self.
+        The node is located and unlinked in a single descent."""
+        self._invalidate(item)
 
         # Helper function to adjust placement of an item
         def lift_max_in_left_subtree_to_top(top):
@@ -168,41 +577,47 @@ class LinkedBST(AbstractCollection):
             # Post: the maximum node in top's left subtree
             #       has been removed
             # Post: top.data = maximum value in top's left subtree
+            # Post: path holds every node whose subtree has changed
             parent = top
+            path.append(top)
             current_node = top.left
             while not current_node.right == None:
                 parent = current_node
+                path.append(parent)
                 current_node = current_node.right
             top.data = current_node.data
+            top.key = current_node.key
             if parent == top:
                 top.left = current_node.left
             else:
                 parent.right = current_node.left
 
-        # Begin main part of the method
-        if self.isEmpty(): return None
-
         # Attempt to locate the node containing the item
+        # (path collects the ancestors visited on the way down)
+        key = self._key_of(item)
         item_removed = None
         pre_root = BSTNode(None)
         pre_root.left = self._root
         parent = pre_root
         direction = 'L'
+        path = []
         current_node = self._root
         while not current_node == None:
-            if current_node.data == item:
+            if current_node.key == key:
                 item_removed = current_node.data
                 break
             parent = current_node
-            if current_node.data > item:
+            path.append(parent)
+            if current_node.key > key:
                 direction = 'L'
                 current_node = current_node.left
             else:
                 direction = 'R'
                 current_node = current_node.right
 
-        # Return None if the item is absent
-        if item_removed == None: return None
+        # Raise KeyError if the item is absent
+        if current_node == None:
+            raise KeyError("Item not in tree.")
 
         # The item is present, so remove its node
 
@@ -231,25 +646,337 @@ class LinkedBST(AbstractCollection):
 
         # All cases: Reset the root (if it hasn't changed no harm done)
         #            Decrement the collection's size counter
+        #            Let subclasses repair the changed path
         #            Return the item
         self._size -= 1
         if self.isEmpty():
             self._root = None
         else:
             self._root = pre_root.left
+            self._retrace(path)
+        self._bloom_removed()
         return item_removed
 
+    def extend(self, items, dedupe=False):
+        '''
+        Adds the items of the iterable items, taken one at a time, so
+        that they never have to be held in memory all at once. While
+        self is empty and the items come in ascending order, they are
+        linked into a balanced tree as they arrive, in O(1) each and
+        with O(log n) extra memory; from the first item out of order
+        on, the rest are added one by one, so unsorted input gains
+        nothing over add. Input sorted without regard to case needs
+        a tree made with key=str.lower to stay ascending. If dedupe
+        is True, items equal to one already in the tree are skipped.
+        :param items: iterable
+        :param dedupe: bool
+        '''
+        items = iter(items)
+        if self._root is None:
+            self._root, self._size, item = self._link_stream(items, dedupe)
+            self._rebuild_bloom()
+            self._invalidate()
+            if item is _END:
+                return
+            if not dedupe or self.find(item) is None:
+                self.add(item)
+        for item in items:
+            if not dedupe or self.find(item) is None:
+                self.add(item)
+
+    def _link_stream(self, items, dedupe):
+        '''
+        Links the items of the iterator items, as long as they come in
+        ascending order, into a balanced tree. The tree grows like a
+        binary counter: a stack holds nodes still waiting for their
+        right subtree, with left subtrees of decreasing heights, and a
+        new node either takes the finished subtree on top as its left
+        one or, as a leaf, completes the waiting nodes whose left
+        subtrees have its height.
+        :param items: iterator
+        :param dedupe: bool, whether to skip items equal to the last one
+        :return: tuple (root or None, the number of items linked,
+                        the first item out of order or _END)
+        '''
+        # (node, waiting): waiting nodes lack their right subtree;
+        # only the top of the stack may be a finished subtree
+        stack = []
+        count = 0
+        last = _END
+        for item in items:
+            key = item if self._key is None else self._key(item)
+            if last is not _END:
+                if key < last:
+                    return self._fold_stream(stack), count, item
+                if dedupe and key == last:
+                    continue
+            last = key
+            node = BSTNode(item, key=key)
+            count += 1
+            if stack and not stack[-1][1]:
+                node.left = stack.pop()[0]
+                stack.append((node, True))
+                continue
+            while stack and stack[-1][0].left.height == node.height:
+                parent = stack.pop()[0]
+                parent.right = node
+                self._refresh(parent)
+                node = parent
+            stack.append((node, False))
+        return self._fold_stream(stack), count, _END
+
+    def _fold_stream(self, stack):
+        '''
+        Joins the nodes left on the stack of _link_stream into one tree.
+        :param stack: list of (BSTNode, bool)
+        :return: BSTNode or None
+        '''
+        right = None
+        while stack:
+            node, waiting = stack.pop()
+            if waiting:
+                right = self._join(node.left, node, right)
+            else:
+                right = node
+        return right
+
+    def remove_many(self, items):
+        '''
+        Removes one occurrence of every item of items that is in self
+        and returns the number of items removed; absent items are
+        skipped. A batch that is small next to the tree is removed
+        item by item, O(k log n) for a balanced tree. A larger one is
+        merged against the inorder traversal and the survivors are
+        relinked into a balanced tree in O(n + k log k).
+        :param items: iterable
+        :return: int
+        '''
+        items = list(items)
+        if len(items) * (self.height() + 2) < self._size:
+            removed = 0
+            for item in items:
+                try:
+                    self.remove(item)
+                    removed += 1
+                except KeyError:
+                    pass
+            return removed
+        kept = []
+        removed = 0
+        for item, side in self._pair_up(items):
+            if side == LEFT_ONLY:
+                kept.append(item)
+            elif side == BOTH:
+                removed += 1
+        self._build(kept)
+        return removed
+
+    def remove_range(self, low, high):
+        '''
+        Removes all the items, where low <= item <= high, and returns
+        their number. The tree is split around the range and the two
+        outer parts are joined again, so the work is O(height) whatever
+        the number of items removed. An AVL tree stays balanced through
+        its joins; the plain joins let the height creep up, so the plain
+        tree is relinked in O(n) once is_balanced() fails, which keeps
+        its height under 2 * log2(n).
+        :param low:
+        :param high:
+        :return: int
+        '''
+        if self.count_range(low, high) == 0:
+            return 0
+        self._invalidate()
+        left, rest = self._split(self._root, self._key_of(low), False)
+        middle, right = self._split(rest, self._key_of(high), True)
+        removed = self._size_of(middle)
+        if right is None:
+            self._root = left
+        else:
+            lowest, right = self._pop_min(right)
+            self._root = self._join(left, lowest, right)
+        self._size -= removed
+        if not self.is_balanced():
+            self.rebalance()
+        self._bloom_removed(removed)
+        return removed
+
+    def _split(self, root, key, inclusive):
+        '''
+        Splits the subtree rooted at root into two trees: the nodes
+        whose keys are smaller than key and the rest, or, if inclusive
+        is True, the nodes whose keys are not larger than key and the
+        rest. The search path is folded back bottom-up with _join,
+        without recursion.
+        :param root: BSTNode or None
+        :param key:
+        :param inclusive: bool
+        :return: tuple of BSTNode or None
+        '''
+        path = []
+        probe = root
+        while probe is not None:
+            path.append(probe)
+            if probe.key < key or (inclusive and probe.key == key):
+                probe = probe.right
+            else:
+                probe = probe.left
+        left = right = None
+        for index in range(len(path) - 1, -1, -1):
+            node = path[index]
+            if node.key < key or (inclusive and node.key == key):
+                left = self._join(node.left, node, left)
+            else:
+                right = self._join(right, node, node.right)
+        return left, right
+
+    def _pop_min(self, root):
+        '''
+        Takes the node with the smallest item out of the non-empty
+        subtree rooted at root.
+        :param root: BSTNode
+        :return: tuple (the detached node, root of the rest or None)
+        '''
+        path = []
+        probe = root
+        while probe.left is not None:
+            path.append(probe)
+            probe = probe.left
+        rest = probe.right
+        for index in range(len(path) - 1, -1, -1):
+            node = path[index]
+            rest = self._join(rest, node, node.right)
+        return probe, rest
+
+    def _join(self, left, node, right):
+        '''
+        Returns the root of a tree made of the subtree left, node and
+        the subtree right, where all items of left are not larger than
+        node's item and all items of right are not smaller.
+        node is hung where the spine of the taller tree reaches the
+        height of the other one, so the result is hardly taller than
+        the taller part; the plain tree does no rotations.
+        :param left: BSTNode or None
+        :param node: BSTNode
+        :param right: BSTNode or None
+        :return: BSTNode
+        '''
+        if self._height(left) > self._height(right) + 1:
+            left = self._own(left)
+            left.right = self._join(left.right, node, right)
+            self._refresh(left)
+            return left
+        if self._height(right) > self._height(left) + 1:
+            right = self._own(right)
+            right.left = self._join(left, node, right.left)
+            self._refresh(right)
+            return right
+        node = self._own(node)
+        node.left = left
+        node.right = right
+        self._refresh(node)
+        return node
+
+    def _rotate_left(self, node):
+        '''
+        Rotates the subtree rooted at node to the left.
+        :param node: BSTNode with a right child
+        :return: BSTNode, the new root of the subtree
+        '''
+        top = node.right
+        node.right = top.left
+        top.left = node
+        self._refresh(node)
+        self._refresh(top)
+        return top
+
+    def _rotate_right(self, node):
+        '''
+        Rotates the subtree rooted at node to the right.
+        :param node: BSTNode with a left child
+        :return: BSTNode, the new root of the subtree
+        '''
+        top = node.left
+        node.left = top.right
+        top.right = node
+        self._refresh(node)
+        self._refresh(top)
+        return top
+
+    def _own(self, node):
+        '''
+        Returns a version of node that may be changed in place.
+        Nodes of the plain tree are never shared, so it is node itself.
+        :param node: BSTNode
+        :return: BSTNode
+        '''
+        return node
+
+    def _retrace(self, path):
+        '''
+        Hook called after add and remove with the nodes on the path
+        from the root down to the changed spot, top first.
+        The plain tree only refreshes the sizes and heights on the path.
+        :param path: list of BSTNode
+        '''
+        for index in range(len(path) - 1, -1, -1):
+            self._refresh(path[index])
+
+    @staticmethod
+    def _size_of(node):
+        '''
+        Return the number of items in the subtree rooted at node.
+        :param node: BSTNode or None
+        :return: int
+        '''
+        if node is None:
+            return 0
+        return node.size
+
+    @staticmethod
+    def _height(node):
+        '''
+        Return the height of the subtree rooted at node.
+        :param node: BSTNode or None
+        :return: int
+        '''
+        if node is None:
+            return -1 #None means we made step from leaf into nowhere
+        return node.height
+
+    def _refresh(self, node):
+        '''
+        Recomputes node's size and height from those of its children.
+        :param node: BSTNode
+        '''
+        left, right = node.left, node.right
+        size, height = 1, 0
+        if left is not None:
+            size += left.size
+            height = left.height + 1
+        if right is not None:
+            size += right.size
+            if right.height >= height:
+                height = right.height + 1
+        node.size = size
+        node.height = height
+
     def replace(self, item, new_item):
         """
         If item is in self, replaces it with newItem and
         returns the old item, or returns None otherwise."""
+        self._invalidate(item, new_item)
+        key = self._key_of(item)
         probe = self._root
         while probe != None:
-            if probe.data == item:
+            if probe.key == key:
                 old_data = probe.data
                 probe.data = new_item
+                probe.key = self._key_of(new_item)
+                self._bloom_added(probe.key)
+                self._bloom_removed()
                 return old_data
-            elif probe.data > item:
+            elif probe.key > key:
                 probe = probe.left
             else:
                 probe = probe.right
@@ -258,25 +985,15 @@ class LinkedBST(AbstractCollection):
     def height(self):
         '''
         Return the height of tree.
+        Heights are kept on the nodes by the mutators, so this is O(1).
         :return: int
         '''
-
-        def height1(top):
-            '''
-            Helper function
-            :param top: BSTNode
-            :return: int
-            '''
-            if top is None:
-                return -1 #top is None means we made step from leaf into nowhere
-            else:
-                return 1 + max(height1(top.left), height1(top.right))
-
-        return height1(self._root)
+        return self._height(self._root)
 
     def is_balanced(self):
         '''
         Return True if tree is balanced.
+        Runs in O(1), as height() does.
         :return: bool
         '''
         return self.height() < 2*log(self._size + 1, 2) - 1
@@ -288,66 +1005,271 @@ class LinkedBST(AbstractCollection):
         :param high:
         :return:
         '''
-        list_of_values = []
-        sorted_list = list(self.inorder())
-        for value in sorted_list:
-            if low <= value <= high:
-                list_of_values.append(value)
-        return list_of_values
+        return list(self.iter_range(low, high))
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items of the tree, where low <= item <= high,
+        in sorted order. Subtrees lying below low are never entered and
+        the walk stops at the first item above high, so reading k items
+        costs O(height + k).
+        :param low:
+        :param high:
+        :return: iterator
+        '''
+        for node in self._range_nodes(self._key_of(low), self._key_of(high)):
+            yield node.data
+
+    def prefix_items(self, prefix, limit=None):
+        '''
+        Lazily yields the items starting with prefix, in sorted order,
+        for autocomplete: at most limit of them if limit is given.
+        The walk descends straight to the first match and stops at the
+        first item past the matches, so reading k items costs
+        O(height + k). The keys of the tree must be strings.
+        :param prefix: str
+        :param limit: int or None
+        :return: iterator
+        '''
+        for node in self._prefix_nodes(self._key_of(prefix), limit):
+            yield node.data
+
+    def _prefix_nodes(self, prefix, limit):
+        '''
+        Yields the first limit nodes (all of them if limit is None)
+        whose keys start with the key prefix, in inorder.
+        '''
+        if limit is not None and limit <= 0:
+            return
+        found = 0
+        for node in self._nodes_from(prefix):
+            if not node.key.startswith(prefix):
+                return
+            yield node
+            found += 1
+            if found == limit:
+                return
+
+    def _range_nodes(self, low, high):
+        '''
+        Yields the nodes whose keys lie between the keys low and high,
+        both included, in inorder.
+        '''
+        for node in self._nodes_from(low):
+            if node.key > high:
+                return
+            yield node
+
+    def _nodes_from(self, low):
+        '''
+        Yields the nodes whose keys are not smaller than the key low,
+        in inorder. Subtrees lying below low are never entered.
+        '''
+        stack = LinkedStack()
+        node = self._root
+        while node is not None or not stack.isEmpty():
+            while node is not None:
+                if node.key < low:
+                    node = node.right
+                else:
+                    stack.push(node)
+                    node = node.left
+            if stack.isEmpty():
+                return
+            node = stack.pop()
+            yield node
+            node = node.right
 
     def rebalance(self):
         '''
         Rebalances the tree.
         :return: self
         '''
-        sorted_list = list(self.inorder())
-        self.clear()
-
-        def recurse(tree, list_of_items: list):
-            """
-            Add elements to tree so it become balanced.
-            """
-            if not list_of_items:
-                return None
-            middle = len(list_of_items) // 2
-            node = list_of_items[middle]
-            tree.add(node)
-            recurse(tree, list_of_items[:middle])
-            recurse(tree, list_of_items[middle+1:])
-            return tree
-
-        self = recurse(self, sorted_list)
+        nodes = list(self._inorder_nodes())
+        self._root = self._link([node.data for node in nodes],
+                                [node.key for node in nodes],
+                                0, len(nodes))
+        self._invalidate()
         return self
 
+    def _build(self, items):
+        '''
+        Replaces the contents of self with items, linked into a
+        perfectly balanced tree.
+        Sorting is done by timsort, which recognizes input already
+        sorted by the tree's key in a single linear scan, so such
+        input is built in O(n); other input costs one sort. words.txt
+        is only sorted without regard to case, so it gets the linear
+        scan with key=str.lower but not with the default key.
+        :param items: iterable
+        '''
+        sorted_list = list(items)
+        sorted_list.sort(key=self._key)
+        if self._key is None:
+            keys = sorted_list
+        else:
+            keys = [self._key(item) for item in sorted_list]
+        self._root = self._link(sorted_list, keys, 0, len(sorted_list))
+        self._size = len(sorted_list)
+        self._rebuild_bloom(keys)
+        self._invalidate()
+
+    def _link(self, sorted_list, keys, low, high):
+        '''
+        Links the items sorted_list[low:high], whose keys are
+        keys[low:high], into a balanced subtree without any comparisons.
+        :param sorted_list: list
+        :param keys: list
+        :param low: int
+        :param high: int
+        :return: BSTNode or None, the root of the subtree
+        '''
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        node = BSTNode(sorted_list[middle], key=keys[middle])
+        node.left = self._link(sorted_list, keys, low, middle)
+        node.right = self._link(sorted_list, keys, middle + 1, high)
+        node.height = (high - low).bit_length() - 1
+        node.size = high - low
+        return node
+
+    def _relink(self, keys, shape):
+        '''
+        Links the nodes of a tree stored in preorder: shape holds the
+        child flags of bstformat for each item of keys.
+        :param keys: list
+        :param shape: bytes
+        :return: BSTNode or None, the root of the tree
+        '''
+        if self._key is None:
+            nodes = [BSTNode(key) for key in keys]
+        else:
+            nodes = [BSTNode(key, key=self._key(key)) for key in keys]
+        if not nodes:
+            return None
+        # Nodes still waiting for their right child
+        waiting = []
+        parent, side = None, None
+        for node, flags in zip(nodes, shape):
+            if side == bstformat.HAS_LEFT:
+                parent.left = node
+            elif side == bstformat.HAS_RIGHT:
+                parent.right = node
+            if flags & bstformat.HAS_RIGHT:
+                waiting.append(node)
+            if flags & bstformat.HAS_LEFT:
+                parent, side = node, bstformat.HAS_LEFT
+            elif waiting:
+                parent, side = waiting.pop(), bstformat.HAS_RIGHT
+        # Children follow their parents in preorder
+        for index in range(len(nodes) - 1, -1, -1):
+            self._refresh(nodes[index])
+        return nodes[0]
+
+    def rank(self, item):
+        '''
+        Return the number of items in the tree that are smaller than
+        item, i.e. the position item has (or would have) in inorder.
+        Takes a single descent, O(height).
+        :param item:
+        :return: int
+        '''
+        return self._count_below(self._key_of(item), False)
+
+    def select(self, index):
+        '''
+        Return the item at position index (counting from 0) of the
+        inorder traversal. Takes a single descent, O(height).
+        Raises: IndexError if index is out of range.
+        :param index: int
+        :return: item
+        '''
+        if not 0 <= index < self._size:
+            raise IndexError("Tree index out of range.")
+        probe = self._root
+        while True:
+            left_size = self._size_of(probe.left)
+            if index < left_size:
+                probe = probe.left
+            elif index == left_size:
+                return probe.data
+            else:
+                index -= left_size + 1
+                probe = probe.right
+
+    def count_range(self, low, high):
+        '''
+        Return the number of items in the tree, where low <= item <= high.
+        Takes two descents, O(height).
+        :param low:
+        :param high:
+        :return: int
+        '''
+        low, high = self._key_of(low), self._key_of(high)
+        if high < low:
+            return 0
+        return self._count_below(high, True) - self._count_below(low, False)
+
+    def _count_below(self, key, inclusive):
+        '''
+        Return the number of items whose keys are smaller than key
+        (or equal to it, if inclusive is True).
+        :param key:
+        :param inclusive: bool
+        :return: int
+        '''
+        count = 0
+        probe = self._root
+        while probe is not None:
+            if probe.key < key or (inclusive and probe.key == key):
+                count += self._size_of(probe.left) + 1
+                probe = probe.right
+            else:
+                probe = probe.left
+        return count
+
     def successor(self, item):
         """
         Returns the smallest item that is larger than
         item, or None if there is no such item.
+        Takes a single descent from the root.
         :param item:
         :type item:
         :return:
         :rtype:
         """
-        sorted_list = list(self.inorder())
-        for value in sorted_list:
-            if value > item:
-                return value
-        return None
+        key = self._key_of(item)
+        found = None
+        probe = self._root
+        while probe is not None:
+            if probe.key > key:
+                found = probe.data
+                probe = probe.left
+            else:
+                probe = probe.right
+        return found
 
     def predecessor(self, item):
         """
         Returns the largest item that is smaller than
         item, or None if there is no such item.
+        Takes a single descent from the root.
         :param item:
         :type item:
         :return:
         :rtype:
         """
-        sorted_list = list(self.inorder())
-        for value in reversed(sorted_list):
-            if value < item:
-                return value
-        return None
+        key = self._key_of(item)
+        found = None
+        probe = self._root
+        while probe is not None:
+            if probe.key < key:
+                found = probe.data
+                probe = probe.right
+            else:
+                probe = probe.left
+        return found
 
     def demo_bst(self, path):
         """
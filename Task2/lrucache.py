@@ -0,0 +1,62 @@
+"""
+File: lrucache.py
+Size-bounded least-recently-used cache for tree lookups.
+"""
+
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """Maps keys to values, keeping at most maxsize entries.
+    When full, the entry used least recently is evicted. The numbers
+    of hits, misses and evictions are counted to help size the cache."""
+
+    def __init__(self, maxsize):
+        """Makes an empty cache for at most maxsize entries.
+        Raises: ValueError if maxsize is smaller than 1."""
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self._maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        """Returns the number of entries in self."""
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Returns the value cached for key, marking it as just used,
+        or default if key is not cached."""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Caches value for key, evicting the least recently used
+        entry if the cache is full."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self._maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key):
+        """Removes the entry for key, if there is one."""
+        self._entries.pop(key, None)
+
+    def clear(self):
+        """Removes all entries; the counters are kept."""
+        self._entries.clear()
+
+    def info(self):
+        """Returns a dictionary with the counters and the sizes."""
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._entries),
+                "maxsize": self._maxsize}
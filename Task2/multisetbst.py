@@ -0,0 +1,363 @@
+"""
+File: multisetbst.py
+Counted multiset version of the self-balancing tree.
+"""
+
+from bstnode import CountedBSTNode
+from linkedavltree import LinkedAVLTree
+from heapq import nlargest
+import bstformat
+
+
+class MultisetBST(LinkedAVLTree):
+    """A self-balancing binary search tree for items that repeat.
+    Equal items share one node that counts them, so memory grows with
+    the number of distinct items and lookups never walk through runs
+    of duplicates. Otherwise it behaves like a tree holding every
+    occurrence: len counts all of them and traversals repeat each item
+    as often as it was added."""
+
+    def __init__(self, sourceCollection=None, key=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present, ordered
+        by key(item) if key is given."""
+        LinkedAVLTree.__init__(self, sourceCollection, key)
+
+    # Accessor methods
+    def __iter__(self):
+        """Supports a preorder traversal on a view of self."""
+        for node in self._preorder_nodes():
+            for _ in range(node.count):
+                yield node.data
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self."""
+        for node in self._inorder_nodes():
+            for _ in range(node.count):
+                yield node.data
+
+    def postorder(self):
+        """Supports a postorder traversal on a view of self."""
+        for node in self._postorder_nodes():
+            for _ in range(node.count):
+                yield node.data
+
+    def levelorder(self):
+        """Supports a levelorder traversal on a view of self."""
+        for node in self._levelorder_nodes():
+            for _ in range(node.count):
+                yield node.data
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items of the tree, where low <= item <= high,
+        in sorted order.
+        :param low:
+        :param high:
+        :return: iterator
+        '''
+        for node in self._range_nodes(self._key_of(low), self._key_of(high)):
+            for _ in range(node.count):
+                yield node.data
+
+    def prefix_items(self, prefix, limit=None):
+        '''
+        Lazily yields the items starting with prefix, in sorted order,
+        each as often as it was added; at most limit of them if limit
+        is given.
+        :param prefix: str
+        :param limit: int or None
+        :return: iterator
+        '''
+        found = 0
+        for node in self._prefix_nodes(self._key_of(prefix), None):
+            for _ in range(node.count):
+                if limit is not None and found >= limit:
+                    return
+                yield node.data
+                found += 1
+
+    def count(self, item):
+        '''
+        Return how many times item is in the tree.
+        :param item:
+        :return: int
+        '''
+        node = self._node_of(item)
+        if node is None:
+            return 0
+        return node.count
+
+    def distinct(self):
+        '''
+        Return the number of different items in the tree.
+        :return: int
+        '''
+        return sum(1 for _ in self._inorder_nodes())
+
+    def most_common(self, k=None):
+        '''
+        Return a list of the k most common items and their counts,
+        from the most common down, as (item, count) pairs; all of them
+        if k is None.
+        :param k: int or None
+        :return: list
+        '''
+        pairs = ((node.data, node.count) for node in self._inorder_nodes())
+        if k is None:
+            return sorted(pairs, key=lambda pair: pair[1], reverse=True)
+        return nlargest(k, pairs, key=lambda pair: pair[1])
+
+    def select(self, index):
+        '''
+        Return the item at position index (counting from 0) of the
+        inorder traversal.
+        Raises: IndexError if index is out of range.
+        :param index: int
+        :return: item
+        '''
+        if not 0 <= index < self._size:
+            raise IndexError("Tree index out of range.")
+        probe = self._root
+        while True:
+            left_size = self._size_of(probe.left)
+            if index < left_size:
+                probe = probe.left
+            elif index < left_size + probe.count:
+                return probe.data
+            else:
+                index -= left_size + probe.count
+                probe = probe.right
+
+    def dump(self, path):
+        '''
+        Writes the items of self, with their repetitions, to the file
+        at path in the compact format of bstformat.
+        :param path: str
+        '''
+        bstformat.dump_sorted(path, list(self.inorder()))
+
+    @classmethod
+    def load(cls, path, key=None, allow_pickle=False):
+        '''
+        Returns a new tree read from the file at path, written by dump.
+        As with LinkedBST.load, pickled items are only read if
+        allow_pickle is True, which must never be given for untrusted
+        files: unpickling can execute arbitrary code.
+        Raises: ValueError if the file is not a tree file, or if its
+        items are pickled and allow_pickle is False.
+        :param path: str
+        :param key: function or None
+        :param allow_pickle: bool
+        :return: MultisetBST
+        '''
+        keys, _ = bstformat.load(path, allow_pickle)
+        return cls(keys, key)
+
+    # Mutator methods
+    def add(self, item):
+        """Adds item to the tree: counts it on the node of an equal
+        item, if there is one, or else adds a new node."""
+        self._invalidate(item)
+        key = self._key_of(item)
+        path = []
+        probe = self._root
+        while probe is not None:
+            path.append(probe)
+            if key < probe.key:
+                probe = probe.left
+            elif probe.key < key:
+                probe = probe.right
+            else:
+                probe.count += 1
+                self._retrace(path)
+                self._size += 1
+                return
+        node = CountedBSTNode(item, key=key)
+        if not path:
+            self._root = node
+        else:
+            if key < path[-1].key:
+                path[-1].left = node
+            else:
+                path[-1].right = node
+            self._retrace(path)
+        self._size += 1
+        self._bloom_added(key)
+
+    def extend(self, items, dedupe=False):
+        '''
+        Adds the items of the iterable items, taken one at a time; if
+        dedupe is True, items already in the tree are skipped.
+        :param items: iterable
+        :param dedupe: bool
+        '''
+        for item in items:
+            if not dedupe or self._node_of(item) is None:
+                self.add(item)
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: one occurrence of item is removed from self."""
+        self._invalidate(item)
+        key = self._key_of(item)
+        path = []
+        probe = self._root
+        while probe is not None:
+            path.append(probe)
+            if key < probe.key:
+                probe = probe.left
+            elif probe.key < key:
+                probe = probe.right
+            else:
+                break
+        if probe is None:
+            raise KeyError("Item not in tree.")
+        removed = probe.data
+        if probe.count == 1:
+            self._unlink(path)
+            self._bloom_removed()
+        else:
+            probe.count -= 1
+        self._retrace(path)
+        self._size -= 1
+        return removed
+
+    def remove_all(self, item):
+        '''
+        Removes every occurrence of item and returns their number.
+        :param item:
+        :return: int
+        '''
+        return self.remove_range(item, item)
+
+    def rebalance(self):
+        '''
+        Rebalances the tree.
+        :return: self
+        '''
+        nodes = list(self._inorder_nodes())
+        self._root = self._link_counted([node.data for node in nodes],
+                                        [node.key for node in nodes],
+                                        [node.count for node in nodes],
+                                        0, len(nodes))
+        self._invalidate()
+        return self
+
+    # Helper methods
+    def _build(self, items):
+        '''
+        Replaces the contents of self with items: equal items are
+        counted and the distinct ones linked into a balanced tree.
+        :param items: iterable
+        '''
+        sorted_list = list(items)
+        sorted_list.sort(key=self._key)
+        distinct = []
+        keys = []
+        counts = []
+        for item in sorted_list:
+            key = self._key_of(item)
+            if keys and keys[-1] == key:
+                counts[-1] += 1
+            else:
+                distinct.append(item)
+                keys.append(key)
+                counts.append(1)
+        self._root = self._link_counted(distinct, keys, counts, 0, len(keys))
+        self._size = len(sorted_list)
+        self._rebuild_bloom(keys)
+        self._invalidate()
+
+    def _unlink(self, path):
+        '''
+        Unlinks the last node of path, in place of which a node with
+        two children takes the largest node of its left subtree, and
+        leaves in path the nodes whose subtrees have changed.
+        :param path: list of CountedBSTNode, from the root down
+        '''
+        node = path[-1]
+        if node.left is not None and node.right is not None:
+            probe = node.left
+            path.append(probe)
+            while probe.right is not None:
+                probe = probe.right
+                path.append(probe)
+            node.data, node.key, node.count = probe.data, probe.key, probe.count
+        target = path.pop()
+        if target.left is None:
+            child = target.right
+        else:
+            child = target.left
+        if not path:
+            self._root = child
+        elif path[-1].left is target:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+
+    def _link_counted(self, distinct, keys, counts, low, high):
+        '''
+        Links the distinct items distinct[low:high], with keys keys[i],
+        each one counts[i] times, into a balanced subtree.
+        :param distinct: list
+        :param keys: list
+        :param counts: list of int
+        :param low: int
+        :param high: int
+        :return: CountedBSTNode or None, the root of the subtree
+        '''
+        if low >= high:
+            return None
+        middle = (low + high) // 2
+        node = CountedBSTNode(distinct[middle], count=counts[middle],
+                              key=keys[middle])
+        node.left = self._link_counted(distinct, keys, counts, low, middle)
+        node.right = self._link_counted(distinct, keys, counts,
+                                        middle + 1, high)
+        self._refresh(node)
+        return node
+
+    def _node_of(self, item):
+        '''
+        Return the node holding item, or None.
+        :param item:
+        :return: CountedBSTNode or None
+        '''
+        key = self._key_of(item)
+        probe = self._root
+        while probe is not None:
+            if key < probe.key:
+                probe = probe.left
+            elif probe.key < key:
+                probe = probe.right
+            else:
+                return probe
+        return None
+
+    def _refresh(self, node):
+        '''
+        Recomputes node's size, counting every occurrence, and height.
+        :param node: CountedBSTNode
+        '''
+        LinkedAVLTree._refresh(self, node)
+        node.size += node.count - 1
+
+    def _count_below(self, key, inclusive):
+        '''
+        Return the number of occurrences of items whose keys are
+        smaller than key (or equal to it, if inclusive is True).
+        :param key:
+        :param inclusive: bool
+        :return: int
+        '''
+        count = 0
+        probe = self._root
+        while probe is not None:
+            if probe.key < key or (inclusive and probe.key == key):
+                count += self._size_of(probe.left) + probe.count
+                probe = probe.right
+            else:
+                probe = probe.left
+        return count
@@ -6,6 +6,9 @@ Author: Ken Lambert
 class Node(object):
     """Represents a singly linked node."""
 
+    # No per-instance __dict__: a node is just its two references
+    __slots__ = ("data", "next")
+
     def __init__(self, data, next = None):
         self.data = data
         self.next = next
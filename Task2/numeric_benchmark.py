@@ -0,0 +1,57 @@
+"""
+Main module for comparing batch queries on numeric keys in the NumPy
+index and in the balanced LinkedBST: a batch of lookups (half of them
+misses) and a batch of range counts.
+"""
+from linkedbst import LinkedBST
+from numericindex import NumericIndex
+import numpy as np
+import time
+
+
+def tree_way(keys, queries, lows, highs):
+    """
+    Return the seconds LinkedBST takes for the lookups and the counts.
+    """
+    tree = LinkedBST(keys.tolist())
+    queries, lows, highs = queries.tolist(), lows.tolist(), highs.tolist()
+    now = time.time()
+    tree.find_many(queries)
+    found = time.time() - now
+    now = time.time()
+    for low, high in zip(lows, highs):
+        tree.count_range(low, high)
+    return found, time.time() - now
+
+
+def index_way(keys, queries, lows, highs):
+    """
+    Return the seconds NumericIndex takes for the lookups and the counts.
+    """
+    index = NumericIndex(keys)
+    now = time.time()
+    index.contains_many(queries)
+    found = time.time() - now
+    now = time.time()
+    index.count_range(lows, highs)
+    return found, time.time() - now
+
+
+def main(size=1000000, count=1000000):
+    """
+    Print the times of both structures for count queries of each kind
+    over size random integer keys.
+    """
+    generator = np.random.default_rng()
+    keys = generator.integers(0, 2 * size, size)
+    queries = generator.integers(0, 2 * size, count)
+    lows = generator.integers(0, 2 * size, count)
+    highs = lows + generator.integers(0, 100, count)
+    for name, way in (("LinkedBST", tree_way), ("NumericIndex", index_way)):
+        found, counted = way(keys, queries, lows, highs)
+        print(f"{name} takes {found} seconds for {count} lookups "
+              f"and {counted} seconds for {count} range counts.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+"""
+File: numericindex.py
+Sorted index of numbers held in a NumPy array, with batch queries.
+
+The keys are kept in one sorted ndarray, so a lookup is a binary
+search over contiguous machine numbers and a whole batch of queries is
+answered by a single call to np.searchsorted, running in C, instead of
+a Python-level descent per query. Inserts are buffered and merged into
+the array in batches, so adding n items costs O(n) array work per
+merge rather than per item.
+"""
+
+from abstractcollection import AbstractCollection
+import numpy as np
+
+# Items buffered by add before they are merged into the array
+BUFFER_SIZE = 4096
+# Batches at least this large are searched in sorted order
+SORTED_BATCH = 1024
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+class NumericIndex(AbstractCollection):
+    """A sorted index of integers or floats offering the interface of
+    LinkedBST, plus batch queries taking and returning arrays.
+    The array starts as dtype (int64 by default) and is widened, to
+    float64 for example, when items that do not fit are added; items
+    that are not numbers, or integers beyond int64, are rejected.
+    Every query first merges the buffered inserts, so it sees all of
+    them."""
+
+    def __init__(self, sourceCollection=None, dtype=np.int64,
+                 buffer_size=BUFFER_SIZE):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present."""
+        AbstractCollection.__init__(self)
+        self._keys = np.empty(0, dtype=dtype)
+        self._pending = []
+        self._buffer_size = buffer_size
+        if sourceCollection is not None:
+            self.add_many(sourceCollection)
+
+    # Accessor methods
+    def __iter__(self):
+        """Supports an inorder traversal on a view of self."""
+        self._flush()
+        return iter(self._keys.tolist())
+
+    def inorder(self):
+        """Supports an inorder traversal on a view of self."""
+        return self.__iter__()
+
+    def __contains__(self, item):
+        """Returns True if target is found or False otherwise."""
+        return self.find(item) is not None
+
+    def find(self, item):
+        """If item matches an item in self, returns the
+        matched item, or None otherwise."""
+        self._flush()
+        index = int(np.searchsorted(self._keys, item, side="left"))
+        if index < len(self._keys) and self._keys[index] == item:
+            return self._keys[index].item()
+        return None
+
+    def contains_many(self, items):
+        '''
+        Return a boolean array telling for each of items whether it is
+        in self, computed without any Python-level loop.
+        :param items: array-like of numbers
+        :return: ndarray of bool
+        '''
+        self._flush()
+        queries = np.asarray(items)
+        if not len(self._keys):
+            return np.zeros(queries.shape, dtype=bool)
+        indices = self._search(queries, "left")
+        np.minimum(indices, len(self._keys) - 1, out=indices)
+        return self._keys[indices] == queries
+
+    def find_many(self, items):
+        '''
+        Returns the list of what find would return for each of items.
+        :param items: array-like of numbers
+        :return: list
+        '''
+        self._flush()
+        queries = np.asarray(items)
+        if not len(self._keys):
+            return [None] * len(queries)
+        indices = self._search(queries, "left")
+        np.minimum(indices, len(self._keys) - 1, out=indices)
+        found = self._keys[indices]
+        return [value if hit else None
+                for value, hit in zip(found.tolist(),
+                                      (found == queries).tolist())]
+
+    def range_find(self, low, high):
+        '''
+        Returns a list of the items, where low <= item <= high.
+        :param low: number
+        :param high: number
+        :return: list
+        '''
+        return self.range_array(low, high).tolist()
+
+    def iter_range(self, low, high):
+        '''
+        Lazily yields the items, where low <= item <= high, in order.
+        :param low: number
+        :param high: number
+        :return: iterator
+        '''
+        return iter(self.range_find(low, high))
+
+    def range_array(self, low, high):
+        '''
+        Return the items, where low <= item <= high, as a read-only
+        view of the index array; valid until self is changed.
+        :param low: number
+        :param high: number
+        :return: ndarray
+        '''
+        self._flush()
+        first = np.searchsorted(self._keys, low, side="left")
+        last = np.searchsorted(self._keys, high, side="right")
+        view = self._keys[first:max(first, last)]
+        view.flags.writeable = False
+        return view
+
+    def range_find_many(self, lows, highs):
+        '''
+        Returns the items of every range lows[i] <= item <= highs[i],
+        as a list of read-only views of the index array; the bounds of
+        all ranges are found by two calls to np.searchsorted.
+        :param lows: array-like of numbers
+        :param highs: array-like of numbers
+        :return: list of ndarray
+        '''
+        self._flush()
+        firsts = self._search(lows, "left")
+        lasts = self._search(highs, "right")
+        np.maximum(lasts, firsts, out=lasts)
+        keys = self._keys.view()
+        keys.flags.writeable = False
+        return [keys[first:last]
+                for first, last in zip(firsts.tolist(), lasts.tolist())]
+
+    def count_range(self, low, high):
+        '''
+        Return the number of items, where low <= item <= high. If low
+        and high are arrays, return an array with the count of every
+        range lows[i] <= item <= highs[i].
+        :param low: number or array-like of numbers
+        :param high: number or array-like of numbers
+        :return: int or ndarray of int
+        '''
+        self._flush()
+        counts = self._search(high, "right") - self._search(low, "left")
+        counts = np.maximum(counts, 0)
+        if counts.ndim == 0:
+            return int(counts)
+        return counts
+
+    def rank(self, item):
+        '''
+        Return the number of items that are smaller than item.
+        :param item: number
+        :return: int
+        '''
+        self._flush()
+        return int(np.searchsorted(self._keys, item, side="left"))
+
+    def select(self, index):
+        '''
+        Return the item at position index (counting from 0).
+        Raises: IndexError if index is out of range.
+        :param index: int
+        :return: number
+        '''
+        self._flush()
+        if not 0 <= index < len(self._keys):
+            raise IndexError("Tree index out of range.")
+        return self._keys[index].item()
+
+    def successor(self, item):
+        """
+        Returns the smallest item that is larger than
+        item, or None if there is no such item.
+        """
+        self._flush()
+        index = int(np.searchsorted(self._keys, item, side="right"))
+        if index < len(self._keys):
+            return self._keys[index].item()
+        return None
+
+    def predecessor(self, item):
+        """
+        Returns the largest item that is smaller than
+        item, or None if there is no such item.
+        """
+        self._flush()
+        index = int(np.searchsorted(self._keys, item, side="left"))
+        if index > 0:
+            return self._keys[index - 1].item()
+        return None
+
+    def bytes_per_node(self):
+        '''
+        Return the memory taken by the index per item: one array slot.
+        :return: float
+        '''
+        return float(self._keys.itemsize)
+
+    # Mutator methods
+    def clear(self):
+        """Makes self become empty."""
+        self._keys = np.empty(0, dtype=self._keys.dtype)
+        self._pending = []
+        self._size = 0
+
+    def add(self, item):
+        """Adds item to the index. It is buffered and merged with
+        the others once buffer_size of them have been added.
+        Raises: TypeError if item is not a number, or OverflowError
+        if it is an integer that does not fit in int64."""
+        if not (type(item) is int and INT64_MIN <= item <= INT64_MAX or
+                type(item) is float) and self._checked(item).ndim:
+            raise TypeError("Only numbers can be added.")
+        self._pending.append(item)
+        self._size += 1
+        if len(self._pending) >= self._buffer_size:
+            self._flush()
+
+    def add_many(self, items):
+        '''
+        Adds all of items, sorted and merged into the array at once.
+        Raises: TypeError if some item is not a number, or
+        OverflowError if some integer does not fit in int64; then
+        none of them is added.
+        :param items: iterable or array-like of numbers
+        '''
+        if not isinstance(items, np.ndarray):
+            items = list(items)
+        items = self._checked(items)
+        self._flush()
+        self._merge(items.ravel())
+        self._size += items.size
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: item is removed from self."""
+        self._flush()
+        index = int(np.searchsorted(self._keys, item, side="left"))
+        if index == len(self._keys) or self._keys[index] != item:
+            raise KeyError("Item not in tree.")
+        removed = self._keys[index].item()
+        self._keys = np.delete(self._keys, index)
+        self._size -= 1
+        return removed
+
+    def remove_many(self, items):
+        '''
+        Removes one occurrence of every item of items that is in self
+        and returns the number of items removed; absent items are
+        skipped. All the positions are computed and deleted at once.
+        :param items: array-like of numbers
+        :return: int
+        '''
+        self._flush()
+        values, wanted = np.unique(np.asarray(items), return_counts=True)
+        firsts = np.searchsorted(self._keys, values, side="left")
+        lasts = np.searchsorted(self._keys, values, side="right")
+        taken = np.minimum(wanted, lasts - firsts)
+        total = int(taken.sum())
+        if total:
+            # The positions firsts[i], ..., firsts[i] + taken[i] - 1
+            starts = np.repeat(firsts, taken)
+            offsets = np.arange(total) - np.repeat(np.cumsum(taken) - taken,
+                                                   taken)
+            self._keys = np.delete(self._keys, starts + offsets)
+            self._size -= total
+        return total
+
+    def remove_range(self, low, high):
+        '''
+        Removes all the items, where low <= item <= high, and returns
+        their number.
+        :param low: number
+        :param high: number
+        :return: int
+        '''
+        self._flush()
+        first = int(np.searchsorted(self._keys, low, side="left"))
+        last = int(np.searchsorted(self._keys, high, side="right"))
+        if last <= first:
+            return 0
+        self._keys = np.concatenate((self._keys[:first], self._keys[last:]))
+        self._size -= last - first
+        return last - first
+
+    # Helper methods
+    def _search(self, queries, side):
+        '''
+        Return np.searchsorted(keys, queries, side) for the sorted keys.
+        A large batch is searched in sorted order, where every search
+        starts from the position of the one before and touches memory
+        close to it, and the positions are put back in input order.
+        :param queries: number or array-like of numbers
+        :param side: "left" or "right"
+        :return: int or ndarray of int
+        '''
+        queries = np.asarray(queries)
+        if queries.ndim != 1 or len(queries) < SORTED_BATCH:
+            return np.searchsorted(self._keys, queries, side=side)
+        order = np.argsort(queries, kind="stable")
+        positions = np.empty(len(queries), dtype=np.intp)
+        positions[order] = np.searchsorted(self._keys, queries[order],
+                                           side=side)
+        return positions
+
+    def _checked(self, values):
+        '''
+        Return values as an ndarray, once sure that merging it into
+        the keys leaves them numbers.
+        Raises: OverflowError if an integer does not fit in int64, or
+        TypeError if values are not numbers.
+        :param values: number or array-like of numbers
+        :return: ndarray
+        '''
+        array = np.asarray(values)
+        # NumPy turns Python integers beyond int64 into uint64, float64
+        # or object arrays, so they are looked for among the items
+        if array.dtype == object:
+            items = array.ravel().tolist()
+        elif array.dtype.kind in "uf" and not isinstance(values, np.ndarray):
+            items = values if isinstance(values, list) else [values]
+        else:
+            items = []
+        if any(type(item) is int and not INT64_MIN <= item <= INT64_MAX
+               for item in items):
+            raise OverflowError("Integer does not fit in int64.")
+        if array.dtype == object:
+            raise TypeError("Only numbers can be added.")
+        if array.dtype.kind == "u" and self._keys.dtype.kind == "i" and \
+                array.size and array.max() > INT64_MAX:
+            raise OverflowError("Integer does not fit in int64.")
+        try:
+            dtype = np.result_type(self._keys, array)
+        except TypeError:
+            dtype = None
+        if dtype is None or not np.issubdtype(dtype, np.number):
+            raise TypeError("Only numbers can be added.")
+        return array
+
+    def _flush(self):
+        '''
+        Merges the buffered inserts into the array.
+        '''
+        if self._pending:
+            self._merge(np.asarray(self._pending))
+            self._pending = []
+
+    def _merge(self, values):
+        '''
+        Merges the array values into the sorted array of keys in
+        O(n + m log m), widening its dtype if needed.
+        :param values: ndarray
+        '''
+        if not values.size:
+            return
+        values = np.sort(values)
+        dtype = np.result_type(self._keys, values)
+        if dtype != self._keys.dtype:
+            self._keys = self._keys.astype(dtype)
+        positions = np.searchsorted(self._keys, values, side="right")
+        self._keys = np.insert(self._keys, positions, values.astype(dtype))
@@ -0,0 +1,46 @@
+"""
+Main module for timing the multi-process build of a LinkedBST from an
+unsorted word file against the single-process one (read the lines,
+then sort and link them) for a growing number of worker processes.
+"""
+from linkedbst import LinkedBST
+from parallelbuild import build_tree
+from multiprocessing import cpu_count
+import time
+
+
+def serial_way(path):
+    """
+    Build a tree from the words of the file at path in one process.
+    """
+    now = time.time()
+    with open(path, 'r') as dictionary:
+        LinkedBST([line.strip() for line in dictionary])
+    return time.time() - now
+
+
+def parallel_way(path, workers):
+    """
+    Build a tree from the words of the file at path with workers processes.
+    """
+    now = time.time()
+    build_tree(path, workers=workers)
+    return time.time() - now
+
+
+def main(path, worker_counts=None):
+    """
+    Print the build times for the file at path.
+    """
+    if worker_counts is None:
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpu_count():
+            worker_counts.append(worker_counts[-1] * 2)
+    print(f"The build in one process takes {serial_way(path)} seconds.")
+    for workers in worker_counts:
+        print(f"The build with {workers} worker processes takes "
+              f"{parallel_way(path, workers)} seconds.")
+
+
+if __name__ == '__main__':
+    main('words.txt')
@@ -0,0 +1,127 @@
+"""
+File: parallelbuild.py
+Multi-process build of trees from large unsorted key files, one key per line.
+
+The file is cut into shards at line boundaries. A pool of processes
+reads, splits and sorts one shard each, in parallel. The sorted runs
+are concatenated and sorted once more: timsort finds the runs and
+merges them in C, far faster than a k-way heapq.merge in Python. The
+sorted keys are linked straight into a balanced LinkedBST, or written
+to a tree file in the format of bstformat, without any tree being
+built.
+"""
+
+from linkedbst import LinkedBST
+import bstformat
+from itertools import chain
+from multiprocessing import Pool, cpu_count
+import os
+
+# Shards per worker: smaller shards balance the work better
+SHARDS_PER_WORKER = 4
+
+
+def shard_bounds(path, shards):
+    '''
+    Return the (start, end) byte offsets of about shards equal parts of
+    the file at path, each one beginning at the start of a line.
+    :param path: str
+    :param shards: int
+    :return: list of tuples of int
+    '''
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, 'rb') as source:
+        for number in range(1, shards):
+            source.seek(max(size * number // shards, starts[-1]))
+            # Move on to the start of the next line
+            source.readline()
+            offset = source.tell()
+            if offset >= size:
+                break
+            if offset > starts[-1]:
+                starts.append(offset)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def sort_shard(task):
+    '''
+    Return the stripped, non-blank lines of one shard, sorted.
+    Runs in a worker process.
+    :param task: tuple (path, start, end, encoding, key)
+    :return: list of str
+    '''
+    path, start, end, encoding, key = task
+    with open(path, 'rb') as source:
+        source.seek(start)
+        text = source.read(end - start).decode(encoding)
+    lines = list(filter(None, map(str.strip, text.split("\n"))))
+    lines.sort(key=key)
+    return lines
+
+
+def sorted_runs(path, workers=None, key=None, encoding="utf-8"):
+    '''
+    Return the lines of the file at path as sorted runs, one for each
+    shard, parsed and sorted by workers processes (one per CPU by
+    default). key must be picklable, e.g. str.lower, not a lambda.
+    :param path: str
+    :param workers: int or None
+    :param key: function or None
+    :param encoding: str
+    :return: list of lists of str
+    '''
+    if workers is None:
+        workers = cpu_count()
+    tasks = [(path, start, end, encoding, key)
+             for start, end in shard_bounds(path, workers * SHARDS_PER_WORKER)]
+    if workers == 1:
+        return [sort_shard(task) for task in tasks]
+    with Pool(workers) as pool:
+        return pool.map(sort_shard, tasks)
+
+
+def merged_runs(runs, key=None):
+    '''
+    Return the keys of the sorted runs as one sorted list. Timsort
+    merges the runs it finds in the concatenation, in C.
+    :param runs: list of lists of str
+    :param key: function or None
+    :return: list of str
+    '''
+    return sorted(chain.from_iterable(runs), key=key)
+
+
+def build_tree(path, tree=None, workers=None, encoding="utf-8"):
+    '''
+    Returns tree (a new LinkedBST if tree is None) with the lines of
+    the file at path. The merged keys are linked into a perfectly
+    balanced tree if tree is None or empty, in O(1) per key, and added
+    one by one otherwise; the order is that of tree's key function.
+    :param path: str
+    :param tree: LinkedBST or None
+    :param workers: int or None
+    :param encoding: str
+    :return: LinkedBST
+    '''
+    key = None if tree is None else tree.key
+    keys = merged_runs(sorted_runs(path, workers, key, encoding), key)
+    if tree is None:
+        return LinkedBST(keys)
+    tree.extend(keys)
+    return tree
+
+
+def build_file(path, tree_path, workers=None, key=None, encoding="utf-8"):
+    '''
+    Writes the perfectly balanced tree over the lines of the file at
+    path to the file at tree_path, in the format read by
+    LinkedBST.load (which must be given the same key).
+    :param path: str
+    :param tree_path: str
+    :param workers: int or None
+    :param key: function or None
+    :param encoding: str
+    '''
+    runs = sorted_runs(path, workers, key, encoding)
+    bstformat.dump_sorted(tree_path, merged_runs(runs, key))
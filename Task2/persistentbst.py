@@ -0,0 +1,200 @@
+"""
+File: persistentbst.py
+Persistent (copy-on-write) version of the self-balancing tree.
+"""
+
+from bstnode import BSTNode
+from linkedavltree import LinkedAVLTree
+
+
+class PersistentBST(LinkedAVLTree):
+    """A self-balancing binary search tree whose nodes are never changed
+    once they are part of a tree. add, remove and replace copy only the
+    O(log n) nodes on the path they touch and share the rest with the
+    previous version, so snapshot() and cloning are O(1) and a reader
+    holding a snapshot (or an iterator) keeps seeing a consistent
+    version while the tree goes on changing."""
+
+    def __init__(self, sourceCollection=None, key=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present, ordered
+        by key(item) if key is given.
+        Another PersistentBST is shared instead of copied, together
+        with its key function, unless a different key is given."""
+        if isinstance(sourceCollection, PersistentBST) and \
+                key in (None, sourceCollection.key):
+            LinkedAVLTree.__init__(self, key=sourceCollection.key)
+            self._root = sourceCollection._root
+            self._size = sourceCollection._size
+        else:
+            LinkedAVLTree.__init__(self, sourceCollection, key)
+
+    def snapshot(self):
+        '''
+        Return a frozen-in-time version of self in O(1). Later changes
+        to either tree are not seen by the other.
+        :return: PersistentBST
+        '''
+        return type(self)(self)
+
+    # Mutator methods
+    def add(self, item):
+        """Adds item to the tree, copying the path to its place."""
+        self._invalidate(item)
+        key = self._key_of(item)
+        if self._root is None:
+            self._root = BSTNode(item, key=key)
+        else:
+            top = self._copy(self._root)
+            path = [top]
+            probe = top
+            while True:
+                if key < probe.key:
+                    if probe.left is None:
+                        probe.left = BSTNode(item, key=key)
+                        break
+                    probe.left = self._copy(probe.left)
+                    probe = probe.left
+                else:
+                    if probe.right is None:
+                        probe.right = BSTNode(item, key=key)
+                        break
+                    probe.right = self._copy(probe.right)
+                    probe = probe.right
+                path.append(probe)
+            self._root = top
+            self._retrace(path)
+        self._size += 1
+        self._bloom_added(key)
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: item is removed from self.
+        The copies made on the way down stay private until the
+        new root is published, so a miss leaves self untouched."""
+        self._invalidate(item)
+        if self._root is None:
+            raise KeyError("Item not in tree.")
+        key = self._key_of(item)
+        top = self._copy(self._root)
+        path = []
+        parent = None
+        node = top
+        while node.key != key:
+            path.append(node)
+            parent = node
+            if node.key > key:
+                if node.left is None:
+                    raise KeyError("Item not in tree.")
+                node.left = self._copy(node.left)
+                node = node.left
+            else:
+                if node.right is None:
+                    raise KeyError("Item not in tree.")
+                node.right = self._copy(node.right)
+                node = node.right
+        item_removed = node.data
+
+        if node.left is not None and node.right is not None:
+            # Move the maximum of the left subtree up into node
+            # and unlink the node it came from instead
+            holder = node
+            path.append(holder)
+            parent = holder
+            holder.left = self._copy(holder.left)
+            node = holder.left
+            while node.right is not None:
+                path.append(node)
+                parent = node
+                node.right = self._copy(node.right)
+                node = node.right
+            holder.data = node.data
+            holder.key = node.key
+
+        if node.left is None:
+            new_child = node.right
+        else:
+            new_child = node.left
+        if parent is None:
+            top = new_child
+        elif parent.left is node:
+            parent.left = new_child
+        else:
+            parent.right = new_child
+        self._root = top
+        self._retrace(path)
+        self._size -= 1
+        self._bloom_removed()
+        return item_removed
+
+    def replace(self, item, new_item):
+        """
+        If item is in self, replaces it with newItem and
+        returns the old item, or returns None otherwise."""
+        self._invalidate(item, new_item)
+        if self.find(item) is None:
+            return None
+        key = self._key_of(item)
+        top = self._copy(self._root)
+        probe = top
+        while probe.key != key:
+            if probe.key > key:
+                probe.left = self._copy(probe.left)
+                probe = probe.left
+            else:
+                probe.right = self._copy(probe.right)
+                probe = probe.right
+        old_data = probe.data
+        probe.data = new_item
+        probe.key = self._key_of(new_item)
+        self._root = top
+        self._bloom_added(probe.key)
+        self._bloom_removed()
+        return old_data
+
+    # Helper methods
+    def _own(self, node):
+        '''
+        Returns a private copy of node, which may still be shared with
+        another version.
+        :param node: BSTNode
+        :return: BSTNode
+        '''
+        return self._copy(node)
+
+    @staticmethod
+    def _copy(node):
+        '''
+        Return a private copy of node that may be changed freely.
+        :param node: BSTNode
+        :return: BSTNode
+        '''
+        clone = BSTNode(node.data, node.left, node.right, node.key)
+        clone.height = node.height
+        clone.size = node.size
+        return clone
+
+    def _rotate_left(self, node):
+        '''
+        Rotates a copy of the subtree rooted at node to the left;
+        both nodes that change are copied first, since either may
+        still be shared with another version.
+        :param node: BSTNode with a right child
+        :return: BSTNode, the new root of the subtree
+        '''
+        node = self._copy(node)
+        node.right = self._copy(node.right)
+        return LinkedAVLTree._rotate_left(self, node)
+
+    def _rotate_right(self, node):
+        '''
+        Rotates a copy of the subtree rooted at node to the right;
+        both nodes that change are copied first, since either may
+        still be shared with another version.
+        :param node: BSTNode with a left child
+        :return: BSTNode, the new root of the subtree
+        '''
+        node = self._copy(node)
+        node.left = self._copy(node.left)
+        return LinkedAVLTree._rotate_right(self, node)
@@ -0,0 +1,77 @@
+"""
+Main module for comparing the radix trie with the balanced LinkedBST on
+a word list: memory taken by each structure, and the time taken by
+lookups (of present and of absent words) and by autocomplete queries.
+"""
+from linkedbst import LinkedBST
+from radixtrie import RadixTrie
+from random import choices
+import time
+import tracemalloc
+
+
+def read_words(path):
+    """
+    Return the list of words in the file at path, one per line.
+    """
+    with open(path, 'r') as dictionary:
+        return [line.strip() for line in dictionary]
+
+
+def build(kind, path):
+    """
+    Return a structure of the given kind holding the words of the file
+    at path and the number of bytes it keeps allocated, counting the
+    strings it holds on to: a LinkedBST keeps every word alive, while
+    the trie keeps only its edge labels.
+    """
+    tracemalloc.start()
+    structure = kind(read_words(path))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return structure, memory
+
+
+def lookup_time(structure, find_list: list):
+    """
+    Return the seconds structure takes to look up every word of find_list.
+    """
+    now = time.time()
+    for word in find_list:
+        structure.find(word)
+    return time.time() - now
+
+
+def prefix_time(structure, prefixes: list, limit=10):
+    """
+    Return the seconds structure takes to list the first limit words
+    starting with each of prefixes.
+    """
+    now = time.time()
+    for prefix in prefixes:
+        list(structure.prefix_items(prefix, limit))
+    return time.time() - now
+
+
+def main(path, count=100000):
+    """
+    Print the memory and lookup times of both structures for the words
+    of the file at path, using count random queries of each kind.
+    """
+    words = read_words(path)
+    hits = choices(words, k=count)
+    misses = [word + "#" for word in hits]
+    prefixes = [word[:3] for word in hits]
+    for kind in (LinkedBST, RadixTrie):
+        structure, memory = build(kind, path)
+        print(f"{kind.__name__} takes {memory / 2 ** 20:.1f} MiB "
+              f"({memory / len(words):.1f} bytes per word).")
+        print(f"{kind.__name__} takes "
+              f"{lookup_time(structure, hits)} seconds for {count} hits, "
+              f"{lookup_time(structure, misses)} seconds for {count} misses "
+              f"and {prefix_time(structure, prefixes)} seconds for {count} "
+              f"autocompletes.")
+
+
+if __name__ == '__main__':
+    main('words.txt')
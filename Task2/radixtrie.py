@@ -0,0 +1,238 @@
+"""
+File: radixtrie.py
+Compressed trie (radix tree) of strings offering the interface of LinkedBST.
+
+Every edge is labelled with a whole run of characters, so a chain of
+nodes with one child each is stored as a single node and the nodes
+number at most twice the items. The prefix shared by many words is
+kept once, on the edge all of them go through, and a lookup reads the
+characters of the item once instead of comparing whole strings at
+every level.
+"""
+
+from abstractcollection import AbstractCollection
+from bisect import bisect_left
+
+
+class _RadixNode(object):
+    """A node of the trie, reached from its parent by label."""
+
+    __slots__ = ("label", "heads", "children", "count")
+
+    def __init__(self, label, count=0):
+        self.label = label
+        # The first characters of the children's labels, in sorted
+        # order, and the children in the same order; children is None
+        # for a leaf. A short string and a list take far less memory
+        # than a dict and keep the children sorted for traversals.
+        self.heads = ""
+        self.children = None
+        # How many times the string spelled down to here was added
+        self.count = count
+
+
+class RadixTrie(AbstractCollection):
+    """A dictionary of strings held in a compressed trie.
+    Items come out in sorted order, as from the inorder traversal of
+    a LinkedBST, and all items with a given prefix are found by a
+    single descent. An item added several times is kept as often."""
+
+    def __init__(self, sourceCollection=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present."""
+        self._root = _RadixNode("")
+        AbstractCollection.__init__(self, sourceCollection)
+
+    # Accessor methods
+    def __iter__(self):
+        """Supports an ordered traversal on a view of self."""
+        return self._walk(self._root, "", None)
+
+    def inorder(self):
+        """Supports an ordered traversal on a view of self.
+        Items are produced lazily, without recursion."""
+        return self._walk(self._root, "", None)
+
+    def __contains__(self, item):
+        """Returns True if target is found or False otherwise."""
+        return self.find(item) is not None
+
+    def find(self, item):
+        """If item matches an item in self, returns the
+        matched item, or None otherwise."""
+        node = self._root
+        index = 0
+        while index < len(item):
+            position = node.heads.find(item[index])
+            if position < 0:
+                return None
+            node = node.children[position]
+            if not item.startswith(node.label, index):
+                return None
+            index += len(node.label)
+        if node.count:
+            return item
+        return None
+
+    def prefix_items(self, prefix, limit=None):
+        '''
+        Lazily yields the items starting with prefix, in sorted order;
+        at most limit of them if limit is given. The node where the
+        matches begin is reached in O(len(prefix)) and reading k items
+        costs O(k) more nodes.
+        :param prefix: str
+        :param limit: int or None
+        :return: iterator
+        '''
+        node = self._root
+        index = 0
+        while index < len(prefix):
+            position = node.heads.find(prefix[index])
+            if position < 0:
+                return iter(())
+            child = node.children[position]
+            if child.label.startswith(prefix[index:]):
+                # The prefix ends on the edge to child
+                return self._walk(child, prefix[:index] + child.label, limit)
+            if not prefix.startswith(child.label, index):
+                return iter(())
+            index += len(child.label)
+            node = child
+        return self._walk(node, prefix, limit)
+
+    def _walk(self, top, spelled, limit):
+        '''
+        Yields the items in the subtrie rooted at top in sorted order,
+        where spelled is the string leading to top; at most limit of
+        them if limit is given.
+        :param top: _RadixNode
+        :param spelled: str
+        :param limit: int or None
+        :return: iterator
+        '''
+        found = 0
+        stack = [(top, spelled)]
+        while stack:
+            node, spelled = stack.pop()
+            for _ in range(node.count):
+                if limit is not None and found >= limit:
+                    return
+                yield spelled
+                found += 1
+            if node.children is not None:
+                # Push the largest first, so the smallest comes out first
+                for child in reversed(node.children):
+                    stack.append((child, spelled + child.label))
+
+    # Mutator methods
+    def clear(self):
+        """Makes self become empty."""
+        self._root = _RadixNode("")
+        self._size = 0
+
+    def add(self, item):
+        """Adds item to the trie, splitting the edge where it
+        leaves the existing strings, if needed."""
+        node = self._root
+        index = 0
+        while index < len(item):
+            position = node.heads.find(item[index])
+            if position < 0:
+                self._attach(node, _RadixNode(item[index:], 1))
+                self._size += 1
+                return
+            child = node.children[position]
+            label = child.label
+            common = 1
+            limit = min(len(label), len(item) - index)
+            while common < limit and label[common] == item[index + common]:
+                common += 1
+            if common < len(label):
+                # item leaves the edge midway: split it there
+                middle = _RadixNode(label[:common])
+                child.label = label[common:]
+                middle.heads = child.label[0]
+                middle.children = [child]
+                node.children[position] = middle
+                child = middle
+            index += common
+            node = child
+        node.count += 1
+        self._size += 1
+
+    def remove(self, item):
+        """Precondition: item is in self.
+        Raises: KeyError if item is not in self.
+        postcondition: one occurrence of item is removed from self.
+        Nodes left without items are unlinked, and a node left with a
+        single child is merged with it, so the trie stays compressed."""
+        parent = None
+        node = self._root
+        index = 0
+        while index < len(item):
+            position = node.heads.find(item[index])
+            if position < 0:
+                raise KeyError("Item not in trie.")
+            child = node.children[position]
+            if not item.startswith(child.label, index):
+                raise KeyError("Item not in trie.")
+            index += len(child.label)
+            parent, node = node, child
+        if not node.count:
+            raise KeyError("Item not in trie.")
+        node.count -= 1
+        self._size -= 1
+        if node.count or parent is None:
+            return item
+        if node.children is None:
+            self._detach(parent, node)
+            if parent is not self._root:
+                self._compress(parent)
+        else:
+            self._compress(node)
+        return item
+
+    @staticmethod
+    def _attach(node, child):
+        '''
+        Hangs child under node, keeping the children in sorted order.
+        :param node: _RadixNode
+        :param child: _RadixNode
+        '''
+        head = child.label[0]
+        if node.children is None:
+            node.heads = head
+            node.children = [child]
+            return
+        position = bisect_left(node.heads, head)
+        node.heads = node.heads[:position] + head + node.heads[position:]
+        node.children.insert(position, child)
+
+    @staticmethod
+    def _detach(node, child):
+        '''
+        Unlinks child from node.
+        :param node: _RadixNode
+        :param child: _RadixNode
+        '''
+        position = node.heads.find(child.label[0])
+        if len(node.children) == 1:
+            node.heads = ""
+            node.children = None
+            return
+        node.heads = node.heads[:position] + node.heads[position + 1:]
+        del node.children[position]
+
+    def _compress(self, node):
+        '''
+        Merges node, if it holds no item and has a single child,
+        with that child; node keeps its place under its parent.
+        :param node: _RadixNode
+        '''
+        if node.count or node.children is None or len(node.children) != 1:
+            return
+        child = node.children[0]
+        node.label += child.label
+        node.heads = child.heads
+        node.children = child.children
+        node.count = child.count
@@ -0,0 +1,92 @@
+"""
+Main module for comparing the splay tree with the balanced tree of
+LinkedBST.fourth_way under skewed (Zipf-like) and uniform lookups,
+both in seconds and in comparisons per lookup.
+"""
+from linkedbst import LinkedBST
+from splaybst import SplayBST
+from random import choices, sample
+import time
+
+
+def zipf_queries(words, count, skew=1.1, hot=10000):
+    """
+    Return count words drawn from hot random words of words, where the
+    k-th most popular one is drawn with weight 1 / k ** skew.
+    """
+    popular = sample(words, min(hot, len(words)))
+    weights = [1 / rank ** skew for rank in range(1, len(popular) + 1)]
+    return choices(popular, weights=weights, k=count)
+
+
+def balanced_way(full_list: list, find_list: list):
+    """
+    Search for the words of find_list in a balanced BSTree (as fourth_way).
+    """
+    tree = LinkedBST(full_list)
+    tree.rebalance()
+    now = time.time()
+    for word in find_list:
+        tree.find(word)
+    return time.time() - now
+
+
+def splay_way(full_list: list, find_list: list):
+    """
+    Search for the words of find_list in a splay tree, starting balanced.
+    """
+    tree = SplayBST(full_list)
+    now = time.time()
+    for word in find_list:
+        tree.find(word)
+    return time.time() - now
+
+
+class CountingWord(str):
+    """
+    A word that counts the order comparisons made against it.
+    """
+    comparisons = 0
+
+    def __lt__(self, other):
+        CountingWord.comparisons += 1
+        return str.__lt__(self, other)
+
+    def __gt__(self, other):
+        CountingWord.comparisons += 1
+        return str.__gt__(self, other)
+
+
+def comparisons_per_lookup(tree, find_list: list):
+    """
+    Return the average number of comparisons tree makes per lookup.
+    """
+    queries = [CountingWord(word) for word in find_list]
+    CountingWord.comparisons = 0
+    for word in queries:
+        tree.find(word)
+    return CountingWord.comparisons / len(queries)
+
+
+def main(path, count=100000):
+    """
+    Print the time and comparisons both trees take for count skewed and count
+    uniform lookups in the words of the file at path.
+    """
+    with open(path, 'r') as dictionary:
+        words = [line.strip() for line in dictionary]
+    mixes = [("skewed", zipf_queries(words, count)),
+             ("uniform", choices(words, k=count))]
+    for name, queries in mixes:
+        print(f"{name.capitalize()} lookups take "
+              f"{balanced_way(words, queries)} seconds in the balanced tree "
+              f"and {splay_way(words, queries)} seconds in the splay tree.")
+        print(f"{name.capitalize()} lookups make "
+              f"{comparisons_per_lookup(LinkedBST(words), queries):.1f} "
+              f"comparisons each in the balanced tree and "
+              f"{comparisons_per_lookup(SplayBST(words), queries):.1f} "
+              f"in the splay tree.")
+
+
+if __name__ == '__main__':
+    main('words.txt')
@@ -0,0 +1,86 @@
+"""
+File: splaybst.py
+Self-adjusting (splay) version of the link-based binary search tree.
+"""
+
+from linkedbst import LinkedBST
+
+
+class SplayBST(LinkedBST):
+    """A link-based binary search tree that adapts to its lookups.
+    Every find (and so every `in` test) splays the node it reaches to
+    the root, so items that are looked up often stay near the top and
+    cost only a few comparisons. Any sequence of lookups costs
+    O(log n) per lookup amortized, and much less when a few items get
+    most of the lookups. Because lookups change the shape of the tree,
+    it must not be read from several threads at once."""
+
+    def __init__(self, sourceCollection=None, key=None):
+        """Sets the initial state of self, which includes the
+        contents of sourceCollection, if it's present, ordered
+        by key(item) if key is given."""
+        LinkedBST.__init__(self, sourceCollection, key)
+
+    def _find(self, item):
+        """Looks item up in the tree itself.
+        The node holding item, or the last node visited if there is
+        none, becomes the root of the tree."""
+        key = self._key_of(item)
+        path = []
+        probe = self._root
+        while probe is not None:
+            path.append(probe)
+            if probe.key < key:
+                probe = probe.right
+            elif probe.key > key:
+                probe = probe.left
+            else:
+                break
+        if path:
+            self._splay(path)
+        if probe is None:
+            return None
+        return probe.data
+
+    def _splay(self, path):
+        '''
+        Moves the last node of path to the root by zig-zig, zig-zag
+        and zig steps, bottom-up and without recursion.
+        :param path: list of BSTNode, from the root down
+        '''
+        node = path.pop()
+        while path:
+            parent = path.pop()
+            if not path:
+                # Zig: parent is the root
+                self._root = self._lift(parent, node)
+                return
+            grand = path.pop()
+            if (grand.left is parent) == (parent.left is node):
+                # Zig-zig: rotate the grandparent first
+                top = self._lift(grand, parent)
+                top = self._lift(top, node)
+            else:
+                # Zig-zag: rotate the parent first
+                if grand.left is parent:
+                    grand.left = self._lift(parent, node)
+                else:
+                    grand.right = self._lift(parent, node)
+                top = self._lift(grand, node)
+            if not path:
+                self._root = top
+            elif path[-1].left is grand:
+                path[-1].left = top
+            else:
+                path[-1].right = top
+
+    def _lift(self, parent, child):
+        '''
+        Rotates child, a child of parent, up into parent's place.
+        :param parent: BSTNode
+        :param child: BSTNode
+        :return: BSTNode, child
+        '''
+        if parent.left is child:
+            return self._rotate_right(parent)
+        return self._rotate_left(parent)
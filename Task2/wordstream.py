@@ -0,0 +1,80 @@
+"""
+File: wordstream.py
+Streaming reader of large word and key files, one item per line.
+
+The file is read in large chunks and every chunk is split into lines
+and stripped by a few calls into C (str.split, map, filter) rather
+than a Python loop over the lines. Only one chunk is held in memory at
+a time, so a tree can be loaded from a file much larger than memory
+allows for a list of its lines.
+"""
+
+from linkedavltree import LinkedAVLTree
+
+# Characters read at a time
+CHUNK_SIZE = 1 << 20
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    '''
+    Yields the lines of the file at path in lists, one list for each
+    chunk of about chunk_size characters, with the surrounding
+    whitespace stripped and the blank lines dropped.
+    :param path: str
+    :param chunk_size: int
+    :param encoding: str
+    :return: iterator of lists of str
+    '''
+    with open(path, 'r', encoding=encoding) as source:
+        tail = ""
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            lines = (tail + chunk).split("\n")
+            # The last line may go on in the next chunk
+            tail = lines.pop()
+            yield list(filter(None, map(str.strip, lines)))
+        tail = tail.strip()
+        if tail:
+            yield [tail]
+
+
+def iter_words(path, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+    '''
+    Yields the stripped, non-blank lines of the file at path one by
+    one, reading it chunk by chunk.
+    :param path: str
+    :param chunk_size: int
+    :param encoding: str
+    :return: iterator of str
+    '''
+    for lines in read_chunks(path, chunk_size, encoding):
+        yield from lines
+
+
+def load_tree(path, tree=None, dedupe=False, chunk_size=CHUNK_SIZE,
+              encoding="utf-8"):
+    '''
+    Returns tree (a new LinkedAVLTree if tree is None) with the lines
+    of the file at path added by tree.extend as they are read. Only a
+    file in ascending order of tree's key is linked straight into a
+    balanced tree; from the first line out of order on, the lines are
+    added one by one, O(log n) each, so unsorted files load no faster
+    than by add. That keeps an AVL tree balanced but may make a plain
+    LinkedBST degenerate. A file sorted without regard to case, like
+    words.txt ('aam' comes before 'Aani'), is ascending for a tree
+    made with key=str.lower, e.g. LinkedAVLTree(key=str.lower). If
+    dedupe is True, lines already in the tree are skipped. Memory
+    stays bounded by one chunk plus the tree.
+    :param path: str
+    :param tree: LinkedBST or None
+    :param dedupe: bool
+    :param chunk_size: int
+    :param encoding: str
+    :return: LinkedBST
+    '''
+    if tree is None:
+        tree = LinkedAVLTree()
+    tree.extend(iter_words(path, chunk_size, encoding), dedupe)
+    return tree